@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/3.2/ref/settings/
 """
 
 import os
+from collections import Counter
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -48,6 +49,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -56,7 +58,8 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-ROOT_URLCONF = 'app.urls'
+# app.asgi switches to app.urls_async, which serves the API as async views.
+ROOT_URLCONF = os.environ.get('DJANGO_ROOT_URLCONF', 'app.urls')
 
 TEMPLATES = [
     {
@@ -76,20 +79,154 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'app.wsgi.application'
 
+# Worker processes started by scripts/run.sh.
+WEB_WORKERS = int(os.environ.get('WEB_WORKERS', 4))
+
 
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
 
+# Connections are kept for DB_CONN_MAX_AGE seconds and reused by the next
+# requests of the same worker thread ('' keeps them for good, 0 closes them
+# after every request). A reused connection is checked before its first
+# query in a request, see core.db.postgresql. Behind a transaction pooling
+# PgBouncer set DB_DISABLE_SERVER_SIDE_CURSORS=1.
+DB_CONN_MAX_AGE = os.environ.get('DB_CONN_MAX_AGE', '600')
+
+# Connections all workers together may keep open on one database server,
+# below its max_connections (100 by default on PostgreSQL) minus what
+# migrations, management commands and other clients need.
+DB_MAX_CONNECTIONS = int(os.environ.get('DB_MAX_CONNECTIONS', 80))
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'core.db.postgresql',
         'HOST': os.environ.get('DB_HOST'),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASS'),
+        'CONN_MAX_AGE': int(DB_CONN_MAX_AGE) if DB_CONN_MAX_AGE else None,
+        'CONN_HEALTH_CHECKS': bool(
+            int(os.environ.get('DB_CONN_HEALTH_CHECKS', 1))
+        ),
+        'DISABLE_SERVER_SIDE_CURSORS': bool(
+            int(os.environ.get('DB_DISABLE_SERVER_SIDE_CURSORS', 0))
+        ),
+        'OPTIONS': {
+            'connect_timeout': int(os.environ.get('DB_CONNECT_TIMEOUT', 5)),
+        },
     }
 }
 
+# Read replicas, e.g. DB_REPLICA_HOSTS=replica1.db,replica2.db, reached
+# with the primary's credentials. The recipe, tag and ingredient views read
+# from them, see core.replicas. In tests they mirror the test database.
+DB_REPLICA_HOSTS = [
+    host.strip()
+    for host in os.environ.get('DB_REPLICA_HOSTS', '').split(',')
+    if host.strip()
+]
+DATABASE_REPLICAS = [
+    f'replica{index}' for index in range(1, len(DB_REPLICA_HOSTS) + 1)
+]
+DATABASES.update({
+    alias: {
+        **DATABASES['default'],
+        'HOST': host,
+        'TEST': {'MIRROR': 'default'},
+    }
+    for alias, host in zip(DATABASE_REPLICAS, DB_REPLICA_HOSTS)
+})
+
+# Shards for the recipes, tags and ingredients of users, e.g.
+# DB_SHARDS=shard1.db/recipes,shard2.db/recipes as [host/]name entries,
+# on the primary's host when it is left out. The default database is the
+# first shard. Append new shards only, as the position of a shard decides
+# the ids it hands out. See core.shards.
+DB_SHARDS = [
+    entry.strip()
+    for entry in os.environ.get('DB_SHARDS', '').split(',')
+    if entry.strip()
+]
+DATABASE_SHARDS = ['default'] + [
+    f'shard{index}' for index in range(1, len(DB_SHARDS) + 1)
+] if DB_SHARDS else []
+DATABASES.update({
+    alias: {
+        **DATABASES['default'],
+        'HOST': entry.rpartition('/')[0] or DATABASES['default']['HOST'],
+        'NAME': entry.rpartition('/')[2],
+    }
+    for alias, entry in zip(DATABASE_SHARDS[1:], DB_SHARDS)
+})
+
+# The shards new users are placed on, the least loaded first; all of them
+# unless DB_OPEN_SHARDS lists some, e.g. to stop filling a full one.
+DATABASE_SHARDS_OPEN = [
+    alias.strip()
+    for alias in os.environ.get('DB_OPEN_SHARDS', '').split(',')
+    if alias.strip()
+] or DATABASE_SHARDS
+
+DATABASE_ROUTERS = ['core.shards.ShardRouter', 'core.replicas.ReplicaRouter']
+
+# Threads the async views of the ASGI deployment run their sync work on.
+# Each of them, and the sync thread of each worker, keeps a connection to
+# every database it used, so by default the pool is sized for the server
+# with the most databases to stay within DB_MAX_CONNECTIONS.
+DATABASES_PER_SERVER = max(
+    Counter(database['HOST'] for database in DATABASES.values()).values()
+)
+ASYNC_VIEW_THREADS = int(os.environ.get(
+    'ASYNC_VIEW_THREADS',
+    max(1, DB_MAX_CONNECTIONS // (WEB_WORKERS * DATABASES_PER_SERVER) - 1),
+))
+
+# Seconds a user reads from the primary after a write, longer than the
+# replication lag.
+DATABASE_REPLICA_PIN_SECONDS = int(
+    os.environ.get('DB_REPLICA_PIN_SECONDS', 5)
+)
+
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+# The local memory cache is per process; use a shared backend such as
+# django.core.cache.backends.memcached.PyMemcacheCache in production.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    }
+}
+# Whether every worker sees the same cache. Entries that other workers
+# have to see dropped are only cached by default when it does.
+CACHE_SHARED = CACHES['default']['BACKEND'] not in (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+# Seconds the shard of a user is cached, not at all by default without a
+# shared cache, where a moved user would be looked up on the old shard.
+USER_SHARD_CACHE_TIMEOUT = int(os.environ.get(
+    'USER_SHARD_CACHE_TIMEOUT', 300 if CACHE_SHARED else 0,
+))
+
+# Seconds a cached list response is kept, not cached by default without a
+# shared cache, where a write would not invalidate the other workers.
+API_CACHE_TIMEOUT = int(os.environ.get(
+    'API_CACHE_TIMEOUT', 300 if CACHE_SHARED else 0,
+))
+
+# Seconds a token to user lookup is cached by CachedTokenAuthentication,
+# not at all by default without a shared cache, where a revoked token
+# would keep authenticating on the other workers.
+AUTH_TOKEN_CACHE_TIMEOUT = int(os.environ.get(
+    'AUTH_TOKEN_CACHE_TIMEOUT', 300 if CACHE_SHARED else 0,
+))
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -132,6 +269,19 @@ MEDIA_URL = '/static/media/'
 MEDIA_ROOT = '/vol/web/media'
 STATIC_ROOT = '/vol/web/static'
 
+# Uploads are named by their content, static files by a hash of theirs and
+# precompressed, see core.storage.
+DEFAULT_FILE_STORAGE = 'core.storage.ContentAddressedStorage'
+STATICFILES_STORAGE = 'core.storage.CompressedManifestStaticFilesStorage'
+
+# How media is sent, see core.views: 'nginx' (X-Accel-Redirect to the
+# internal MEDIA_ACCEL_REDIRECT_URL location), 'uwsgi' (X-Sendfile) or ''
+# to stream it from Django.
+MEDIA_OFFLOAD = os.environ.get('MEDIA_OFFLOAD', '')
+MEDIA_ACCEL_REDIRECT_URL = os.environ.get(
+    'MEDIA_ACCEL_REDIRECT_URL', '/internal/media/'
+)
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
@@ -141,8 +291,32 @@ AUTH_USER_MODEL = 'core.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    'DEFAULT_RENDERER_CLASSES': [
+        'recipe.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
 }
 
+# Smallest response in bytes that is compressed, see core.middleware.
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))
+
+# Largest recipe image upload in bytes and in pixels.
+IMAGE_UPLOAD_MAX_SIZE = int(
+    os.environ.get('IMAGE_UPLOAD_MAX_SIZE', 20 * 1024 * 1024)
+)
+IMAGE_UPLOAD_MAX_PIXELS = int(
+    os.environ.get('IMAGE_UPLOAD_MAX_PIXELS', 50_000_000)
+)
+
+# Threads of the in-process background task queue, see core.tasks. With
+# TASKS_EAGER=1 tasks run right away in the process that queues them.
+TASK_WORKERS = int(os.environ.get('TASK_WORKERS', 2))
+TASKS_EAGER = bool(int(os.environ.get('TASKS_EAGER', 0)))
+
+# Default and maximum `page_size` for the paginated list endpoints.
+API_PAGE_SIZE = int(os.environ.get('API_PAGE_SIZE', 50))
+API_MAX_PAGE_SIZE = int(os.environ.get('API_MAX_PAGE_SIZE', 200))
+
 SPECTACULAR_SETTINGS = {
     'COMPONENT_SPLIT_REQUEST': True,
 }
\ No newline at end of file
@@ -1,8 +1,10 @@
+import re
+
 from drf_spectacular.views import SpectacularAPIView , SpectacularSwaggerView , SpectacularRedocView
 from django.contrib import admin
-from django.urls import path , include
-from django.conf.urls.static import static
+from django.urls import path , re_path , include
 from django.conf import settings
+from core.views import serve_media
 
 
 urlpatterns = [
@@ -11,12 +13,10 @@ urlpatterns = [
     path('api/docs/' , SpectacularSwaggerView.as_view(url_name ='api-schema') ,name='api-docs'),
     path('api/redoc/' , SpectacularRedocView.as_view(url_name ='api-schema') ,name='api-docs'),
     path('api/user/',include('user.urls')),
-    path('api/recipe/',include('recipe.urls'))
+    path('api/recipe/',include('recipe.urls')),
+    re_path(
+        r'^%s(?P<path>.*)$' % re.escape(settings.MEDIA_URL.lstrip('/')),
+        serve_media,
+        name='media',
+    ),
 ]
-
-
-if settings.DEBUG:
-    urlpatterns += static(
-        settings.MEDIA_URL,
-        document_root=settings.MEDIA_ROOT,
-    )
\ No newline at end of file
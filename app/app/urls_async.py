@@ -0,0 +1,14 @@
+"""
+URL configuration of the ASGI deployment.
+
+The same URLs as `app.urls`, with the user and recipe API views running as
+async views.
+"""
+from core.asyncviews import async_urlpatterns
+
+from .urls import urlpatterns as sync_urlpatterns
+
+
+urlpatterns = async_urlpatterns(
+    sync_urlpatterns, namespaces={'user', 'recipe'},
+)
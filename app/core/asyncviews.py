@@ -0,0 +1,131 @@
+"""
+Async views for the ASGI deployment.
+
+Django 3.2 has no async ORM and DRF views are sync, so an async view here
+awaits its sync view on a dedicated thread pool. While a request waits on
+the database or a slow upload, the event loop keeps serving other
+requests, and only `ASYNC_VIEW_THREADS` threads are needed for any number
+of idle connections.
+
+Everything that touches the database happens on the pool thread: the view,
+the rendering of the response and the iteration of a streaming response,
+which is spooled to a temporary file because Django 3.2 iterates
+streaming content on the event loop.
+"""
+import functools
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, connections
+from django.urls import URLPattern, URLResolver
+
+
+SPOOL_MAX_MEMORY = 1024 * 1024
+SPOOL_CHUNK_SIZE = 64 * 1024
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.ASYNC_VIEW_THREADS,
+            thread_name_prefix='async-view',
+        )
+    return _executor
+
+
+def shutdown_executor():
+    """Close the connections of the pool threads and stop the pool."""
+    global _executor
+    if _executor is None:
+        return
+    # Connections can only be closed by their thread; the barrier spreads
+    # one close over every thread of the pool.
+    barrier = threading.Barrier(settings.ASYNC_VIEW_THREADS)
+
+    def close_connections():
+        barrier.wait()
+        connections.close_all()
+
+    for _ in range(settings.ASYNC_VIEW_THREADS):
+        _executor.submit(close_connections)
+    _executor.shutdown(wait=True)
+    _executor = None
+
+
+def _spool(response):
+    """Buffer the streaming content of `response` in a temporary file."""
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY)
+    for chunk in response.streaming_content:
+        spool.write(chunk)
+    spool.seek(0)
+    response.streaming_content = iter(
+        lambda: spool.read(SPOOL_CHUNK_SIZE), b''
+    )
+    response._resource_closers.append(spool.close)
+
+
+def _run(view, request, *args, **kwargs):
+    # Pool threads have their own connections, which the request_started
+    # and request_finished signals of the event loop thread never see.
+    close_old_connections()
+    try:
+        response = view(request, *args, **kwargs)
+        if callable(getattr(response, 'render', None)):
+            response = response.render()
+        if response.streaming:
+            _spool(response)
+        return response
+    finally:
+        close_old_connections()
+
+
+def as_async_view(view):
+    """Return an async view running the sync `view` on the thread pool."""
+    @functools.wraps(view)
+    async def async_view(request, *args, **kwargs):
+        run = sync_to_async(
+            _run, thread_sensitive=False, executor=get_executor(),
+        )
+        return await run(view, request, *args, **kwargs)
+
+    return async_view
+
+
+def async_urlpatterns(urlpatterns, namespaces):
+    """Copy `urlpatterns` with every view included under one of
+    `namespaces` made async.
+    """
+    return [
+        _async_resolver(pattern)
+        if isinstance(pattern, URLResolver) and pattern.namespace in namespaces
+        else pattern
+        for pattern in urlpatterns
+    ]
+
+
+def _async_resolver(resolver):
+    patterns = []
+    for pattern in resolver.url_patterns:
+        if isinstance(pattern, URLResolver):
+            pattern = _async_resolver(pattern)
+        else:
+            pattern = URLPattern(
+                pattern.pattern,
+                as_async_view(pattern.callback),
+                pattern.default_args,
+                pattern.name,
+            )
+        patterns.append(pattern)
+    return URLResolver(
+        resolver.pattern,
+        patterns,
+        resolver.default_kwargs,
+        resolver.app_name,
+        resolver.namespace,
+    )
@@ -0,0 +1,54 @@
+"""
+Token authentication backed by the cache.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+
+def token_cache_key(key):
+    # Hash the key so raw tokens never end up in the cache.
+    return 'auth-token:' + hashlib.sha256(key.encode()).hexdigest()
+
+
+def invalidate_token(key):
+    cache.delete(token_cache_key(key))
+
+
+def invalidate_user_tokens(user):
+    keys = Token.objects.filter(user=user).values_list('key', flat=True)
+    cache.delete_many([token_cache_key(key) for key in keys])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Drop-in `TokenAuthentication` that caches token lookups.
+
+    A cache hit authenticates without a database query. Entries expire
+    after `AUTH_TOKEN_CACHE_TIMEOUT` seconds and are invalidated as soon as
+    the token is deleted or its user is saved, e.g. deactivated. Bulk
+    updates send no signals, so callers deactivating users with
+    `QuerySet.update()` have to call `invalidate_user_tokens`. Without a
+    shared cache nothing is cached by default, as the invalidation would
+    only reach one worker.
+    """
+
+    def authenticate_credentials(self, key):
+        if not settings.AUTH_TOKEN_CACHE_TIMEOUT:
+            return super().authenticate_credentials(key)
+        cache_key = token_cache_key(key)
+        credentials = cache.get(cache_key)
+        if credentials is None:
+            credentials = super().authenticate_credentials(key)
+            cache.set(
+                cache_key, credentials, settings.AUTH_TOKEN_CACHE_TIMEOUT
+            )
+        elif not credentials[0].is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.')
+            )
+        return credentials
@@ -0,0 +1,73 @@
+"""
+PostgreSQL backend for persistent connections.
+
+With `CONN_MAX_AGE` a connection outlives the request and is reused by the
+next one on the same worker thread. This adds what Django 3.2 lacks for
+that to be safe:
+
+- With `CONN_HEALTH_CHECKS` a reused connection is checked with a cheap
+  query before the first use in a request, and replaced if the server
+  closed it meanwhile (restart, failover, idle timeout of a pooler),
+  instead of failing that request. Fresh connections are not checked.
+- A connection opened before a worker is forked (e.g. while uWSGI loads
+  the app in its master) is dropped in the child without being closed, as
+  closing it would end the session the parent still uses over the shared
+  socket. The child opens its own on first use.
+"""
+import os
+
+from django.db import connections
+from django.db.backends.postgresql import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    health_check_done = False
+
+    @property
+    def health_check_enabled(self):
+        return (
+            self.settings_dict.get('CONN_HEALTH_CHECKS', False)
+            and self.settings_dict['CONN_MAX_AGE'] != 0
+        )
+
+    def connect(self):
+        super().connect()
+        self.health_check_done = True
+
+    def close_if_unusable_or_obsolete(self):
+        # Runs at the start and end of every request.
+        super().close_if_unusable_or_obsolete()
+        self.health_check_done = False
+
+    def close_if_health_check_failed(self):
+        if (
+            self.connection is None
+            or not self.health_check_enabled
+            or self.health_check_done
+            or self.in_atomic_block
+        ):
+            return
+        if not self.is_usable():
+            self.close()
+        self.health_check_done = True
+
+    def _cursor(self, name=None):
+        self.close_if_health_check_failed()
+        return super()._cursor(name)
+
+
+# Inherited connections are kept referenced, as the garbage collector
+# closing them would end the parent's sessions as well.
+_inherited_connections = []
+
+
+def _drop_inherited_connections():
+    for conn in connections.all():
+        if isinstance(conn, DatabaseWrapper) and conn.connection is not None:
+            _inherited_connections.append(conn.connection)
+            conn.connection = None
+            conn.health_check_done = False
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_drop_inherited_connections)
@@ -0,0 +1,76 @@
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+def percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * fraction))
+    return sorted_values[index]
+
+
+class Command(BaseCommand):
+    help = (
+        'Send concurrent GET requests to a running server and report its '
+        'throughput and latency, e.g. to compare the WSGI and ASGI '
+        'deployments.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('base_url', help='e.g. http://localhost:8000')
+        parser.add_argument(
+            '--path', action='append', dest='paths',
+            help='Path to request, repeat for several. Defaults to the '
+                 'recipe list.',
+        )
+        parser.add_argument('--token', help='API token to authenticate with.')
+        parser.add_argument('--concurrency', type=int, default=32)
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--timeout', type=float, default=30)
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or ['/api/recipe/recipes/']
+        headers = {}
+        if options['token']:
+            headers['Authorization'] = f'Token {options["token"]}'
+        urls = [
+            options['base_url'].rstrip('/') + paths[i % len(paths)]
+            for i in range(options['requests'])
+        ]
+
+        def fetch(url):
+            request = Request(url, headers=headers)
+            start = time.perf_counter()
+            try:
+                with urlopen(request, timeout=options['timeout']) as response:
+                    response.read()
+                    status = response.status
+            except HTTPError as exc:
+                status = exc.code
+            except (URLError, OSError):
+                status = None
+            return status, (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            results = list(pool.map(fetch, urls))
+        elapsed = time.perf_counter() - start
+
+        latencies = sorted(ms for status, ms in results if status == 200)
+        errors = len(results) - len(latencies)
+        if not latencies:
+            raise CommandError(f'All {errors} requests failed.')
+
+        self.stdout.write(
+            f'{len(results)} requests, {options["concurrency"]} concurrent, '
+            f'{errors} failed\n'
+            f'{len(latencies) / elapsed:.1f} requests/s\n'
+            f'latency ms: mean {statistics.mean(latencies):.1f}'
+            f' p50 {percentile(latencies, 0.50):.1f}'
+            f' p95 {percentile(latencies, 0.95):.1f}'
+            f' p99 {percentile(latencies, 0.99):.1f}'
+            f' max {latencies[-1]:.1f}'
+        )
@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from core import shards
+
+
+class Command(BaseCommand):
+    help = (
+        'Move the recipes, tags and ingredients of users to another shard. '
+        'Their writes are refused while the data is copied.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('emails', nargs='+', help='Users to move.')
+        parser.add_argument(
+            '--to', required=True, dest='target', help='The target shard.',
+        )
+
+    def handle(self, *args, **options):
+        if options['target'] not in settings.DATABASE_SHARDS:
+            raise CommandError(
+                f'Unknown shard {options["target"]}, the shards are: '
+                f'{", ".join(settings.DATABASE_SHARDS) or "none"}.'
+            )
+        users = get_user_model().objects.filter(email__in=options['emails'])
+        missing = set(options['emails']) - {user.email for user in users}
+        if missing:
+            raise CommandError(f'Unknown users: {", ".join(sorted(missing))}.')
+
+        for user in users:
+            moved = shards.move_user(user, options['target'])
+            self.stdout.write(
+                f'{user.email}: {moved} recipes moved to {options["target"]}'
+            )
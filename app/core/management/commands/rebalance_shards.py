@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core import shards
+
+
+class Command(BaseCommand):
+    help = (
+        'Even out the number of users per shard by moving users from the '
+        'fullest shards onto the open ones, newest users first.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Only print the planned moves.',
+        )
+
+    def handle(self, *args, **options):
+        if not settings.DATABASE_SHARDS:
+            raise CommandError('No shards are configured.')
+        moves = shards.plan_rebalance(
+            shards.shard_loads(), settings.DATABASE_SHARDS_OPEN,
+        )
+        if not moves:
+            self.stdout.write('The shards are balanced.')
+            return
+
+        for (source, target), count in sorted(moves.items()):
+            self.stdout.write(f'{source} -> {target}: {count} users')
+            if options['dry_run']:
+                continue
+            users = shards.users_on(source).order_by('-pk')[:count]
+            for user in list(users):
+                shards.move_user(user, target)
@@ -0,0 +1,56 @@
+# Generated by Django 3.2.25 on 2026-10-18 01:26
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+from core.search import update_search_vectors
+
+
+SEARCH_INDEX = django.contrib.postgres.indexes.GinIndex(
+    fields=['search_vector'], name='recipe_search_vector_idx',
+)
+
+
+def add_search_index(apps, schema_editor):
+    # GIN indexes only exist on PostgreSQL.
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.add_index(apps.get_model('core', 'Recipe'), SEARCH_INDEX)
+
+
+def remove_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.remove_index(
+            apps.get_model('core', 'Recipe'), SEARCH_INDEX,
+        )
+
+
+def build_search_vectors(apps, schema_editor):
+    Recipe = apps.get_model('core', 'Recipe')
+    update_search_vectors(
+        Recipe.objects.using(schema_editor.connection.alias).all()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_recipe_tag_ingredient_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(model_name='recipe', index=SEARCH_INDEX),
+            ],
+            database_operations=[
+                migrations.RunPython(add_search_index, remove_search_index),
+            ],
+        ),
+        migrations.RunPython(build_search_vectors, migrations.RunPython.noop),
+    ]
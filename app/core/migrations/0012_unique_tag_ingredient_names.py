@@ -0,0 +1,87 @@
+from django.db import migrations
+from django.db.models import Count, Min
+from django.db.models.functions import Lower, Now
+
+
+def merge_duplicates(apps, schema_editor):
+    """Merge tags and ingredients whose names differ only in case.
+
+    The oldest row of every (user, lower(name)) group is kept; the links
+    of the others are moved to it in bulk, or dropped where the recipe is
+    already linked to the kept row, and the others are deleted.
+    """
+    Recipe = apps.get_model('core', 'Recipe')
+    for model_name, field in (('Tag', 'tags'), ('Ingredient', 'ingredients')):
+        model = apps.get_model('core', model_name)
+        through = getattr(Recipe, field).through
+        column = f'{model_name.lower()}_id'
+        rows = model.objects.annotate(name_key=Lower('name'))
+
+        keep = {
+            (group['user_id'], group['name_key']): group['keep']
+            for group in rows.values('user_id', 'name_key').annotate(
+                keep=Min('id'), count=Count('id'),
+            ).filter(count__gt=1)
+        }
+        if not keep:
+            continue
+        replace = {}
+        for pk, user_id, name_key in rows.filter(
+            user_id__in={user_id for user_id, _ in keep},
+        ).values_list('id', 'user_id', 'name_key'):
+            kept = keep.get((user_id, name_key))
+            if kept is not None and kept != pk:
+                replace[pk] = kept
+
+        linked = set(through.objects.filter(
+            **{f'{column}__in': set(replace.values())}
+        ).values_list('recipe_id', column))
+        moves, drops, recipes = {}, [], set()
+        for link_id, recipe_id, pk in through.objects.filter(
+            **{f'{column}__in': list(replace)}
+        ).values_list('id', 'recipe_id', column):
+            target = (recipe_id, replace[pk])
+            recipes.add(recipe_id)
+            if target in linked:
+                drops.append(link_id)
+            else:
+                linked.add(target)
+                moves.setdefault(replace[pk], []).append(link_id)
+
+        through.objects.filter(id__in=drops).delete()
+        for kept, link_ids in moves.items():
+            through.objects.filter(id__in=link_ids).update(**{column: kept})
+        model.objects.filter(id__in=list(replace)).delete()
+        # The recipes and kept rows now read differently; bump versions.
+        Recipe.objects.filter(id__in=recipes).update(updated_at=Now())
+        model.objects.filter(id__in=set(replace.values())).update(
+            updated_at=Now()
+        )
+
+
+class Migration(migrations.Migration):
+    # The merge commits on its own: PostgreSQL can not build an index on a
+    # table with foreign key checks of the same transaction still pending.
+    atomic = False
+
+    dependencies = [
+        ('core', '0011_stored_file'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicates, migrations.RunPython.noop, atomic=True,
+        ),
+        # Django 3.2 constraints can not hold expressions, so the
+        # case-insensitive unique indexes are created directly.
+        migrations.RunSQL(
+            'CREATE UNIQUE INDEX tag_user_lower_name_uniq '
+            'ON core_tag (user_id, LOWER(name));',
+            'DROP INDEX tag_user_lower_name_uniq;',
+        ),
+        migrations.RunSQL(
+            'CREATE UNIQUE INDEX ingredient_user_lower_name_uniq '
+            'ON core_ingredient (user_id, LOWER(name));',
+            'DROP INDEX ingredient_user_lower_name_uniq;',
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 3.2.25 on 2026-10-18 02:41
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_unique_tag_ingredient_names'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserShard',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='shard', serialize=False, to='core.user')),
+                ('shard', models.CharField(db_index=True, max_length=64)),
+                ('moving', models.BooleanField(default=False)),
+            ],
+        ),
+    ]
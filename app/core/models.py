@@ -1,6 +1,8 @@
 import uuid
 import os
 
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.contrib.auth.models import AbstractBaseUser , BaseUserManager , PermissionsMixin
 from django.conf import settings
@@ -47,7 +49,10 @@ class User(AbstractBaseUser,PermissionsMixin):
 
 
 class Recipe(models.Model):
-    user = models.ForeignKey(settings.AUTH_USER_MODEL , on_delete=models.CASCADE)
+    # Indexed by the composite indexes in Meta, which start with user.
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, db_index=False,
+    )
     title = models.CharField(max_length=255)
     description = models.TextField(blank=True)
     time_minutes = models.IntegerField()
@@ -56,13 +61,42 @@ class Recipe(models.Model):
     tags = models.ManyToManyField('Tag')
     ingredients = models.ManyToManyField('Ingredient')
     image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    # Storage names of the resized copies of `image`, by size and format.
+    # Empty until the background processing of the latest upload is done.
+    image_renditions = models.JSONField(default=dict, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Maintained by core.search.update_search_vectors, PostgreSQL only.
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # Serves the per-user listing ordered by -id.
+            models.Index(fields=['user', 'id'], name='recipe_user_id_idx'),
+            GinIndex(
+                fields=['search_vector'], name='recipe_search_vector_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.title
 
 class Tag(models.Model):
     name = models.CharField(max_length=255)
-    user = models.ForeignKey(settings.AUTH_USER_MODEL , on_delete=models.CASCADE)
+    # Indexed by the composite indexes in Meta, which start with user.
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, db_index=False,
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Serves the per-user listing ordered by (-name, -id).
+            models.Index(
+                fields=['user', 'name', 'id'], name='tag_user_name_idx',
+            ),
+        ]
+        # Names are unique per user regardless of case, by the
+        # tag_user_lower_name_uniq index of migration 0012.
 
     def __str__(self):
         return self.name
@@ -70,7 +104,52 @@ class Tag(models.Model):
 
 class Ingredient(models.Model):
     name = models.CharField(max_length=255 )
-    user = models.ForeignKey(settings.AUTH_USER_MODEL , on_delete=models.CASCADE)
+    # Indexed by the composite indexes in Meta, which start with user.
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, db_index=False,
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Serves the per-user listing ordered by (-name, -id).
+            models.Index(
+                fields=['user', 'name', 'id'], name='ingredient_user_name_idx',
+            ),
+        ]
+        # Names are unique per user regardless of case, by the
+        # ingredient_user_lower_name_uniq index of migration 0012.
 
     def __str__(self):
         return self.name
+
+
+class StoredFile(models.Model):
+    """Reference count of a file in the content addressed storage.
+
+    Identical uploads share one file; it is deleted with its last reference.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    refcount = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return self.name
+
+
+class UserShard(models.Model):
+    """The shard holding the recipes, tags and ingredients of a user.
+
+    Users without a row are on the default database. `moving` is set while
+    the data is copied to another shard, see core.shards.
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='shard',
+    )
+    shard = models.CharField(max_length=64, db_index=True)
+    moving = models.BooleanField(default=False)
+
+    def __str__(self):
+        return f'{self.user_id}: {self.shard}'
@@ -0,0 +1,406 @@
+"""
+Sharding of the recipe data by user.
+
+With `DATABASE_SHARDS` configured, the recipes, tags and ingredients of a
+user and the links between them live on one shard, the default database
+being the first. `UserShard` rows on the default database map users to
+shards; users without one are on the default database. Users, tokens and
+everything else stay on the default database, and each shard keeps an
+inactive stand-in row of its users for the foreign keys of their data.
+
+The views using `UserShardMixin` work on the shard of the requesting user,
+and so do the background tasks they queue. Outside of such a scope, e.g.
+in the admin, the sharded models are read from the default database.
+
+Ids stay unique across shards, so data keeps its ids when `move_user`
+copies it to another shard: shard n hands out ids from n * SHARD_ID_SPAN.
+Reads use the shard of the user cached for `USER_SHARD_CACHE_TIMEOUT`
+seconds. Writes look it up again in a transaction of the default
+database that locks the user's row until the response is ready, and a
+move takes the same lock to start, so no write lands on the old shard.
+"""
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Count, Q
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.permissions import SAFE_METHODS
+
+from .models import Ingredient, Recipe, Tag, UserShard
+from .search import update_search_vectors
+
+
+SHARDED_MODELS = {
+    'core.recipe', 'core.tag', 'core.ingredient',
+    'core.recipe_tags', 'core.recipe_ingredients',
+}
+
+# Ids above 2 ** 53 lose precision in JavaScript clients, which leaves
+# room for 32 shards.
+SHARD_ID_SPAN = 2 ** 48
+
+MOVE_BATCH_SIZE = 1000
+
+# The shard the sharded models of the current request or task are on.
+_shard = ContextVar('shard', default=None)
+
+
+class ShardMoving(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Your recipes are being moved, try again shortly.'
+    default_code = 'shard_moving'
+
+
+def _cache_key(user_id):
+    return f'user-shard:{user_id}'
+
+
+def lookup_user_shard(user_id):
+    """The shard of `user_id` and whether their data is being moved."""
+    row = UserShard.objects.filter(user_id=user_id).values_list(
+        'shard', 'moving',
+    ).first()
+    return tuple(row) if row else (DEFAULT_DB_ALIAS, False)
+
+
+def get_user_shard(user_id):
+    """`lookup_user_shard`, cached."""
+    if not settings.USER_SHARD_CACHE_TIMEOUT:
+        return lookup_user_shard(user_id)
+    key = _cache_key(user_id)
+    shard = cache.get(key)
+    if shard is None:
+        shard = lookup_user_shard(user_id)
+        cache.set(key, shard, settings.USER_SHARD_CACHE_TIMEOUT)
+    return tuple(shard)
+
+
+def lock_user_shard(user_id):
+    """`lookup_user_shard`, locking the row of `user_id` on the default
+    database until the transaction ends, which holds off a move.
+    """
+    list(get_user_model().objects.select_for_update(no_key=True).filter(
+        pk=user_id,
+    ).values_list('pk'))
+    return lookup_user_shard(user_id)
+
+
+def forget_user_shard(user_id):
+    cache.delete(_cache_key(user_id))
+
+
+def current_shard():
+    """The shard the current request or task works on."""
+    return _shard.get() or DEFAULT_DB_ALIAS
+
+
+@contextmanager
+def using_shard(alias):
+    """Work with the sharded models of the shard `alias` within the block."""
+    token = _shard.set(alias)
+    try:
+        yield
+    finally:
+        _shard.reset(token)
+
+
+def iterate_on_shard(iterable, alias):
+    """Iterate `iterable` with the sharded models on the shard `alias`.
+
+    For streamed responses, which are iterated after the view returned.
+    The shard is set around each step, as the steps may run in different
+    contexts.
+    """
+    iterator = iter(iterable)
+    while True:
+        with using_shard(alias):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+
+class ShardRouter:
+    def _shard_for(self, model, hints):
+        if (
+            not settings.DATABASE_SHARDS
+            or model._meta.label_lower not in SHARDED_MODELS
+        ):
+            return None
+        instance = hints.get('instance')
+        if instance is not None:
+            # Related managers pass the instance they belong to.
+            if (
+                instance._meta.label_lower in SHARDED_MODELS
+                and instance._state.db in settings.DATABASE_SHARDS
+            ):
+                return instance._state.db
+            if isinstance(instance, get_user_model()):
+                return get_user_shard(instance.pk)[0]
+            if getattr(instance, 'user_id', None) is not None:
+                return get_user_shard(instance.user_id)[0]
+        return current_shard()
+
+    def db_for_read(self, model, **hints):
+        shard = self._shard_for(model, hints)
+        # Reads of the default database are left to the replica router.
+        return None if shard == DEFAULT_DB_ALIAS else shard
+
+    def db_for_write(self, model, **hints):
+        return self._shard_for(model, hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if not settings.DATABASE_SHARDS:
+            return None
+        databases = {*settings.DATABASE_SHARDS, *settings.DATABASE_REPLICAS}
+        if {obj1._state.db, obj2._state.db} <= databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Every shard has the full schema.
+        return None
+
+
+class UserShardMixin:
+    """Work on the shard of the requesting user, and refuse writes while
+    their data is being moved.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        with using_shard(None):
+            if (
+                settings.DATABASE_SHARDS
+                and request.method not in SAFE_METHODS
+            ):
+                # Keeps the lock of lock_user_shard until the write is done.
+                with transaction.atomic(using=DEFAULT_DB_ALIAS):
+                    return super().dispatch(request, *args, **kwargs)
+            return super().dispatch(request, *args, **kwargs)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if settings.DATABASE_SHARDS and request.user.is_authenticated:
+            if request.method in SAFE_METHODS:
+                shard, _ = get_user_shard(request.user.pk)
+            else:
+                shard, moving = lock_user_shard(request.user.pk)
+                if moving:
+                    raise ShardMoving()
+            _shard.set(shard)
+
+
+def reserve_ids(alias):
+    """Make the shard `alias` hand out ids of its own range."""
+    index = settings.DATABASE_SHARDS.index(alias)
+    if not index:
+        return
+    start = index * SHARD_ID_SPAN
+    connection = connections[alias]
+    with connection.cursor() as cursor:
+        tables = set(connection.introspection.table_names(cursor))
+        for model in (Recipe, Tag, Ingredient):
+            table = model._meta.db_table
+            if table not in tables:
+                continue
+            if connection.vendor == 'postgresql':
+                cursor.execute(
+                    "SELECT setval(pg_get_serial_sequence(%s, 'id'), "
+                    "GREATEST(%s, nextval(pg_get_serial_sequence(%s, 'id'))), "
+                    "false)",
+                    [table, start, table],
+                )
+            elif connection.vendor == 'sqlite':
+                cursor.execute(
+                    'SELECT seq FROM sqlite_sequence WHERE name = %s', [table]
+                )
+                row = cursor.fetchone()
+                if row is None:
+                    cursor.execute(
+                        'INSERT INTO sqlite_sequence (name, seq) '
+                        'VALUES (%s, %s)', [table, start - 1],
+                    )
+                elif row[0] < start - 1:
+                    cursor.execute(
+                        'UPDATE sqlite_sequence SET seq = %s WHERE name = %s',
+                        [start - 1, table],
+                    )
+            else:
+                raise NotImplementedError(
+                    f'Shards on {connection.vendor} are not supported.'
+                )
+
+
+def ensure_stand_in(user, alias):
+    """Keep an inactive row of `user` on the shard `alias`."""
+    get_user_model().objects.using(alias).update_or_create(
+        pk=user.pk, defaults={
+            'email': f'user-{user.pk}@shard.invalid',
+            'name': '',
+            'is_active': False,
+            'password': make_password(None),
+        },
+    )
+
+
+def users_on(alias):
+    """The users whose data is on the shard `alias`."""
+    on_shard = Q(shard__shard=alias)
+    if alias == DEFAULT_DB_ALIAS:
+        on_shard |= Q(shard__isnull=True)
+    return get_user_model().objects.filter(on_shard)
+
+
+def shard_loads():
+    """The number of users on each shard."""
+    loads = dict.fromkeys(settings.DATABASE_SHARDS, 0)
+    for row in UserShard.objects.values('shard').annotate(users=Count('pk')):
+        loads[row['shard']] = row['users']
+    loads[DEFAULT_DB_ALIAS] += get_user_model().objects.filter(
+        shard__isnull=True,
+    ).count()
+    return loads
+
+
+def place_user(user):
+    """Put the new `user` on the least loaded open shard."""
+    shards = settings.DATABASE_SHARDS_OPEN
+    if len(shards) == 1:
+        shard = shards[0]
+    else:
+        loads = shard_loads()
+        shard = min(shards, key=lambda alias: loads.get(alias, 0))
+    if shard != DEFAULT_DB_ALIAS:
+        ensure_stand_in(user, shard)
+    UserShard.objects.create(user=user, shard=shard)
+    return shard
+
+
+def plan_rebalance(loads, targets):
+    """Count the moves, by (source, target) shard, that even out `loads`,
+    the users per shard, moving users onto the shards in `targets` only.
+    """
+    loads = dict(loads)
+    moves = Counter()
+    while targets:
+        source = max(loads, key=loads.get)
+        target = min(targets, key=lambda alias: loads.get(alias, 0))
+        if loads[source] - loads.get(target, 0) <= 1:
+            break
+        loads[source] -= 1
+        loads[target] = loads.get(target, 0) + 1
+        moves[source, target] += 1
+    return moves
+
+
+def _copied_fields(model):
+    # The search vectors are rebuilt on the target shard.
+    return [
+        field.attname for field in model._meta.concrete_fields
+        if field.name != 'search_vector'
+    ]
+
+
+def _pages(queryset, fields):
+    """Yield the `fields` of the rows of `queryset` in pages by id."""
+    last = None
+    while True:
+        page = queryset.order_by('pk')
+        if last is not None:
+            page = page.filter(pk__gt=last)
+        rows = list(page.values(*fields)[:MOVE_BATCH_SIZE])
+        if not rows:
+            return
+        yield rows
+        last = rows[-1]['id']
+
+
+def _delete_data(user_id, alias):
+    """Delete the data of `user_id` on the shard `alias`, page by page."""
+    with using_shard(alias):
+        for model in (Recipe, Tag, Ingredient):
+            rows = model.objects.using(alias).filter(user_id=user_id)
+            for page in _pages(rows, ['id']):
+                doomed = rows.filter(pk__in=[row['id'] for row in page])
+                with transaction.atomic(using=alias):
+                    if model is Recipe:
+                        # The copies on the other shard keep the
+                        # references to the images.
+                        doomed.update(image=None, image_renditions={})
+                    doomed.delete()
+
+
+def _copy_page(model, rows, source, target):
+    """Copy the `rows` of `model` and, for recipes, their links."""
+    with transaction.atomic(using=target):
+        model.objects.using(target).bulk_create(
+            [model(**row) for row in rows],
+        )
+        if model is not Recipe:
+            return
+        ids = [row['id'] for row in rows]
+        for through, column in (
+            (Recipe.tags.through, 'tag_id'),
+            (Recipe.ingredients.through, 'ingredient_id'),
+        ):
+            pairs = through.objects.using(source).filter(
+                recipe_id__in=ids,
+            ).values_list('recipe_id', column)
+            through.objects.using(target).bulk_create([
+                through(recipe_id=recipe_id, **{column: pk})
+                for recipe_id, pk in pairs
+            ])
+        update_search_vectors(Recipe.objects.using(target).filter(
+            pk__in=ids,
+        ))
+
+
+def move_user(user, target):
+    """Move the recipes, tags and ingredients of `user` to the shard
+    `target`; return the number of recipes moved.
+
+    The move waits for the writes of the user in progress, and their
+    writes are refused until it is done. The data is copied and then
+    deleted from the old shard page by page, tags and ingredients before
+    the recipes linking them.
+    """
+    if target not in settings.DATABASE_SHARDS:
+        raise ValueError(f'Unknown shard: {target}.')
+    with transaction.atomic():
+        # The lock writes hold, see UserShardMixin.
+        source, _ = lock_user_shard(user.pk)
+        if source == target:
+            return 0
+        UserShard.objects.update_or_create(
+            user=user, defaults={'shard': source, 'moving': True},
+        )
+    forget_user_shard(user.pk)
+
+    if target != DEFAULT_DB_ALIAS:
+        ensure_stand_in(user, target)
+    # Left over by an interrupted move.
+    _delete_data(user.pk, target)
+    moved = 0
+    with using_shard(source):
+        for model in (Tag, Ingredient, Recipe):
+            rows = model.objects.using(source).filter(user_id=user.pk)
+            for page in _pages(rows, _copied_fields(model)):
+                _copy_page(model, page, source, target)
+                if model is Recipe:
+                    moved += len(page)
+
+    # The data on the old shard is unused from here on.
+    UserShard.objects.filter(user=user).update(shard=target, moving=False)
+    forget_user_shard(user.pk)
+    _delete_data(user.pk, source)
+    if source != DEFAULT_DB_ALIAS:
+        get_user_model().objects.using(source).filter(pk=user.pk).delete()
+    return moved
@@ -0,0 +1,158 @@
+"""
+Signal receivers of the core app.
+
+The `updated_at` row versions and recipe search vectors are kept in step
+with changes that do not save the row itself. A recipe's representation
+and search vector include its tags and ingredients, so linking, unlinking,
+renaming or deleting one of them refreshes the affected recipes. The
+linked tags and ingredients are touched as well, also when a recipe is
+deleted, because their recipes decide the `assigned_only` lists and the
+recipe counts.
+
+Cached token lookups are dropped when a token is deleted or its user
+changes.
+
+With shards, new users are placed on one, the data of a deleted user is
+deleted on theirs, and migrated shards hand out ids of their own range.
+"""
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import (
+    post_save, post_delete, pre_delete, m2m_changed, post_migrate,
+)
+from django.dispatch import receiver
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from . import shards
+from .authentication import invalidate_token, invalidate_user_tokens
+from .models import User, Recipe, Tag, Ingredient
+from .search import update_search_vectors
+
+
+# The lookup from Recipe to each of its related models.
+RECIPE_LOOKUPS = {Tag: 'tags', Ingredient: 'ingredients'}
+
+
+def touch(queryset):
+    """Bump `updated_at` of every row in `queryset`."""
+    queryset.update(updated_at=timezone.now())
+
+
+def refresh_recipes(queryset):
+    """Bring the version and search vector of the recipes up to date."""
+    touch(queryset)
+    update_search_vectors(queryset)
+
+
+# The recipe columns the search vector is built from.
+SEARCH_FIELDS = {'title', 'description'}
+
+
+@receiver(post_save, sender=Recipe)
+def refresh_search_vector(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not SEARCH_FIELDS & set(update_fields):
+        return
+    update_search_vectors(Recipe.objects.filter(pk=instance.pk))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def refresh_linked_rows(sender, instance, action, model, pk_set, **kwargs):
+    if action == 'pre_clear':
+        # post_clear is not told which rows were unlinked, remember them.
+        instance._cleared_pks = set(sender.objects.filter(**{
+            f'{instance._meta.model_name}_id': instance.pk,
+        }).values_list(f'{model._meta.model_name}_id', flat=True))
+        return
+    if action == 'post_clear':
+        pk_set = instance.__dict__.pop('_cleared_pks', set())
+    elif action not in ('post_add', 'post_remove'):
+        return
+
+    if isinstance(instance, Recipe):
+        refresh_recipes(Recipe.objects.filter(pk=instance.pk))
+        if pk_set:
+            touch(model.objects.filter(pk__in=pk_set))
+    else:
+        touch(type(instance).objects.filter(pk=instance.pk))
+        if pk_set:
+            refresh_recipes(Recipe.objects.filter(pk__in=pk_set))
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def refresh_recipes_on_rename(sender, instance, created=False, **kwargs):
+    if not created:
+        refresh_recipes(
+            Recipe.objects.filter(**{RECIPE_LOOKUPS[sender]: instance})
+        )
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def remember_recipes_on_delete(sender, instance, **kwargs):
+    # The links are gone by post_delete, remember the recipes now.
+    instance._recipe_pks = list(Recipe.objects.filter(
+        **{RECIPE_LOOKUPS[sender]: instance}
+    ).values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def refresh_recipes_on_delete(sender, instance, **kwargs):
+    pks = instance.__dict__.pop('_recipe_pks', [])
+    if pks:
+        refresh_recipes(Recipe.objects.filter(pk__in=pks))
+
+
+@receiver(pre_delete, sender=Recipe)
+def remember_linked_rows_on_delete(sender, instance, **kwargs):
+    # The cascade removes the links without sending m2m_changed.
+    instance._linked_pks = {
+        model: list(getattr(instance, lookup).values_list('pk', flat=True))
+        for model, lookup in RECIPE_LOOKUPS.items()
+    }
+
+
+@receiver(post_delete, sender=Recipe)
+def touch_linked_rows_on_delete(sender, instance, **kwargs):
+    for model, pks in instance.__dict__.pop('_linked_pks', {}).items():
+        if pks:
+            touch(model.objects.filter(pk__in=pks))
+
+
+@receiver(post_delete, sender=Token)
+def drop_cached_token(sender, instance, **kwargs):
+    invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=User)
+def drop_cached_user_tokens(sender, instance, created=False, **kwargs):
+    if not created:
+        invalidate_user_tokens(instance)
+
+
+@receiver(post_save, sender=User)
+def place_new_user(sender, instance, created=False, using=None, **kwargs):
+    # Stand-ins saved on the shards are not users of their own.
+    if created and using == DEFAULT_DB_ALIAS and settings.DATABASE_SHARDS:
+        shards.place_user(instance)
+
+
+@receiver(pre_delete, sender=User)
+def delete_sharded_data(sender, instance, using=None, **kwargs):
+    if using != DEFAULT_DB_ALIAS or not settings.DATABASE_SHARDS:
+        return
+    shard, _ = shards.lookup_user_shard(instance.pk)
+    if shard != DEFAULT_DB_ALIAS:
+        # Deleting the stand-in cascades to the user's data on the shard.
+        with shards.using_shard(shard):
+            User.objects.using(shard).filter(pk=instance.pk).delete()
+    shards.forget_user_shard(instance.pk)
+
+
+@receiver(post_migrate)
+def reserve_shard_ids(sender, using=None, **kwargs):
+    if sender.label == 'core' and using in settings.DATABASE_SHARDS:
+        shards.reserve_ids(using)
@@ -0,0 +1,148 @@
+"""
+File storages: content addressed uploads and compressed static files.
+
+A saved file is named by the SHA-256 of its content, computed while it is
+streamed to disk, so identical uploads resolve to one stored file. Only
+the directory and the extension of the requested name are kept:
+`uploads/recipe/photo.jpg` is stored as `uploads/recipe/ab/ab12...ef.jpg`.
+
+Every save takes a reference on the file and every delete drops one, the
+counts are kept in `StoredFile`. The file itself is removed with its last
+reference. Its row is locked while a reference is taken or dropped, so a
+concurrent save of the same content can not lose the file to a delete.
+Files stored before the counting started have no row and are deleted on
+the first delete.
+
+Static files are collected under names that include a hash of their
+content, so they can be cached for good, and a gzip and a Brotli copy of
+every text file is written next to it for the web server to send as is.
+"""
+import gzip
+import hashlib
+import os
+import tempfile
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+
+from .models import StoredFile
+
+try:
+    import brotli
+except ImportError:  # Only the gzip copies are written without it.
+    brotli = None
+
+
+class ContentAddressedStorage(FileSystemStorage):
+
+    def get_available_name(self, name, max_length=None):
+        # The final name is only known once the content is hashed.
+        return name
+
+    def _save(self, name, content):
+        directory, basename = os.path.split(name)
+        extension = os.path.splitext(basename)[1].lower()
+        full_directory = self.path(directory)
+        os.makedirs(full_directory, exist_ok=True)
+
+        digest = hashlib.sha256()
+        fd, temp_path = tempfile.mkstemp(suffix='.part', dir=full_directory)
+        try:
+            with os.fdopen(fd, 'wb') as temp_file:
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    temp_file.write(chunk)
+            hexdigest = digest.hexdigest()
+            name = os.path.join(
+                directory, hexdigest[:2], hexdigest + extension,
+            )
+            self._add_reference(name, temp_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        return name.replace('\\', '/')
+
+    def _add_reference(self, name, temp_path):
+        full_path = self.path(name)
+        with transaction.atomic():
+            stored, _ = StoredFile.objects.select_for_update().get_or_create(
+                name=name
+            )
+            if not os.path.exists(full_path):
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                file_move_safe(temp_path, full_path)
+                if self.file_permissions_mode is not None:
+                    os.chmod(full_path, self.file_permissions_mode)
+            StoredFile.objects.filter(pk=stored.pk).update(
+                refcount=F('refcount') + 1
+            )
+
+    def delete(self, name):
+        """Drop a reference to `name`; delete the file with the last one."""
+        with transaction.atomic():
+            stored = StoredFile.objects.select_for_update().filter(
+                name=name
+            ).first()
+            if stored is not None and stored.refcount > 1:
+                StoredFile.objects.filter(pk=stored.pk).update(
+                    refcount=F('refcount') - 1
+                )
+                return
+            if stored is not None:
+                stored.delete()
+            super().delete(name)
+
+    def references(self, name):
+        """The number of references to `name`."""
+        stored = StoredFile.objects.filter(name=name).first()
+        return stored.refcount if stored else 0
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Hashed static file names plus precompressed `.gz` and `.br` copies."""
+    compress_extensions = (
+        '.css', '.js', '.map', '.json', '.svg', '.txt', '.html', '.xml',
+        '.ico', '.eot', '.ttf', '.otf',
+    )
+    # Files too small to gain from compression are skipped.
+    compress_min_size = 256
+    manifest_strict = False
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            # Not collected, e.g. in development and the tests.
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+
+        names = set(paths) | set(self.hashed_files.values())
+        for name in sorted(names):
+            if name.lower().endswith(self.compress_extensions):
+                self.compress(name)
+
+    def compress(self, name):
+        with self.open(name) as original:
+            content = original.read()
+        if len(content) < self.compress_min_size:
+            return
+
+        compressed = {
+            '.gz': gzip.compress(content, compresslevel=9, mtime=0),
+        }
+        if brotli is not None:
+            compressed['.br'] = brotli.compress(content)
+        for extension, data in compressed.items():
+            if len(data) >= len(content):
+                continue
+            if self.exists(name + extension):
+                self.delete(name + extension)
+            self._save(name + extension, ContentFile(data))
@@ -0,0 +1,56 @@
+"""
+A minimal in-process background task queue.
+
+Tasks run on a pool of `TASK_WORKERS` threads of the web process once the
+transaction that queued them commits. It stands in for a real queue such
+as Celery: a task still queued when the process exits is lost, so tasks
+must leave the data usable without them. With `TASKS_EAGER` a task runs
+right away in the caller instead, which the tests rely on.
+
+A task runs in the context it was queued in, e.g. on the shard of the
+user whose request queued it, after that shard's transaction commits.
+"""
+import contextvars
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from .shards import current_shard
+
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.TASK_WORKERS, thread_name_prefix='task',
+        )
+    return _executor
+
+
+def _run(func, args, kwargs):
+    close_old_connections()
+    try:
+        func(*args, **kwargs)
+    except Exception:
+        logger.exception('Task %s failed.', func.__qualname__)
+    finally:
+        close_old_connections()
+
+
+def enqueue(func, *args, **kwargs):
+    """Run `func(*args, **kwargs)` in the background after the commit."""
+    def submit():
+        if settings.TASKS_EAGER:
+            func(*args, **kwargs)
+        else:
+            context = contextvars.copy_context()
+            get_executor().submit(context.run, _run, func, args, kwargs)
+
+    transaction.on_commit(submit, using=current_shard())
@@ -0,0 +1,94 @@
+import asyncio
+import json
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.test import AsyncClient, TransactionTestCase, override_settings
+from django.urls import resolve, reverse
+from rest_framework.authtoken.models import Token
+
+from core import asyncviews
+from core.models import Recipe
+
+
+@override_settings(ROOT_URLCONF='app.urls_async')
+class AsyncViewTests(TransactionTestCase):
+    """Test the API served as async views by the ASGI deployment.
+
+    The views run on a thread pool with their own database connections, so
+    the data has to be committed for them to see it.
+    """
+
+    @classmethod
+    def tearDownClass(cls):
+        # Persistent connections of the pool threads would keep the test
+        # database from being dropped.
+        asyncviews.shutdown_executor()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'async@example.com', '12345'
+        )
+        token = Token.objects.create(user=self.user)
+        self.client = AsyncClient()
+        self.headers = {'authorization': f'Token {token.key}'}
+        Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=5,
+            price=Decimal('2.00'),
+        )
+
+    def test_api_views_are_async(self):
+        """Test the API views are coroutines and the admin stays sync."""
+        for url in (reverse('recipe:recipe-list'), reverse('user:me')):
+            self.assertTrue(asyncio.iscoroutinefunction(resolve(url).func))
+        self.assertFalse(
+            asyncio.iscoroutinefunction(resolve('/admin/login/').func)
+        )
+
+    async def test_list_recipes(self):
+        """Test listing recipes through an async view."""
+        res = await self.client.get(
+            reverse('recipe:recipe-list'), **self.headers
+        )
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(
+            [r['title'] for r in res.json()['results']], ['Soup']
+        )
+
+    async def test_create_recipe(self):
+        """Test a request body is parsed and saved on the pool thread."""
+        payload = {
+            'title': 'Curry', 'time_minutes': 30, 'price': '5.00',
+            'tags': [{'name': 'Spicy'}],
+        }
+
+        res = await self.client.post(
+            reverse('recipe:recipe-list'), json.dumps(payload),
+            content_type='application/json', **self.headers,
+        )
+
+        self.assertEqual(res.status_code, 201)
+        exists = await sync_to_async(
+            Recipe.objects.filter(user=self.user, tags__name='Spicy').exists
+        )()
+        self.assertTrue(exists)
+
+    async def test_export_streams(self):
+        """Test a streaming response is produced on the pool thread."""
+        res = await self.client.get(
+            reverse('recipe:recipe-export'), {'format': 'ndjson'},
+            **self.headers,
+        )
+
+        self.assertEqual(res.status_code, 200)
+        rows = b''.join(res.streaming_content).splitlines()
+        self.assertEqual(json.loads(rows[0])['title'], 'Soup')
+
+    async def test_unauthenticated(self):
+        """Test authentication still applies to the async views."""
+        res = await self.client.get(reverse('user:me'))
+
+        self.assertEqual(res.status_code, 401)
@@ -1,7 +1,10 @@
+from io import StringIO
 from unittest.mock import patch
+from urllib.error import URLError
 from psycopg2 import OperationalError as psycopg2opError
 from django.db.utils import OperationalError
 from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.test import SimpleTestCase
 
 
@@ -22,4 +25,31 @@ class CommandTests(SimpleTestCase):
         call_command('wait_for_db')
 
         self.assertEqual(patched_check.call_count  , 5)
-        patched_check.assert_called_with(databases=['default'])
\ No newline at end of file
+        patched_check.assert_called_with(databases=['default'])
+
+
+@patch('core.management.commands.loadtest.urlopen')
+class LoadTestCommandTests(SimpleTestCase):
+    def test_loadtest_reports_throughput(self, patched_urlopen):
+        response = patched_urlopen.return_value.__enter__.return_value
+        response.status = 200
+        out = StringIO()
+
+        call_command(
+            'loadtest', 'http://testserver', token='abc',
+            requests=10, concurrency=2, stdout=out,
+        )
+
+        self.assertEqual(patched_urlopen.call_count, 10)
+        request = patched_urlopen.call_args[0][0]
+        self.assertEqual(
+            request.full_url, 'http://testserver/api/recipe/recipes/'
+        )
+        self.assertEqual(request.get_header('Authorization'), 'Token abc')
+        self.assertIn('10 requests, 2 concurrent, 0 failed', out.getvalue())
+
+    def test_loadtest_all_failed(self, patched_urlopen):
+        patched_urlopen.side_effect = URLError('refused')
+
+        with self.assertRaises(CommandError):
+            call_command('loadtest', 'http://testserver', requests=3)
@@ -0,0 +1,86 @@
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.test import TransactionTestCase
+
+from core.db.postgresql import base
+
+
+@skipUnless(
+    isinstance(connections[DEFAULT_DB_ALIAS], base.DatabaseWrapper),
+    'Needs the PostgreSQL backend of core.db.',
+)
+class PersistentConnectionTests(TransactionTestCase):
+    def new_connection(self, **settings):
+        conn = connections.create_connection(DEFAULT_DB_ALIAS)
+        conn.settings_dict = {
+            **conn.settings_dict,
+            'CONN_MAX_AGE': None,
+            'CONN_HEALTH_CHECKS': True,
+            **settings,
+        }
+        self.addCleanup(conn.close)
+        return conn
+
+    def backend_pid(self, conn):
+        with conn.cursor() as cursor:
+            cursor.execute('SELECT pg_backend_pid()')
+            return cursor.fetchone()[0]
+
+    def test_connection_reused(self):
+        """Test a connection outlives the request."""
+        conn = self.new_connection()
+        pid = self.backend_pid(conn)
+
+        conn.close_if_unusable_or_obsolete()
+
+        self.assertEqual(self.backend_pid(conn), pid)
+
+    def test_closed_connection_replaced(self):
+        """Test a connection the server closed between requests is
+        replaced instead of failing the next one.
+        """
+        conn = self.new_connection()
+        pid = self.backend_pid(conn)
+        conn.close_if_unusable_or_obsolete()
+
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_terminate_backend(%s)', [pid])
+
+        self.assertNotEqual(self.backend_pid(conn), pid)
+
+    def test_checked_once_per_request(self):
+        """Test only the first query of a request checks the connection."""
+        conn = self.new_connection()
+        self.backend_pid(conn)
+        conn.close_if_unusable_or_obsolete()
+
+        with patch.object(
+            conn, 'is_usable', wraps=conn.is_usable,
+        ) as patched_is_usable:
+            self.backend_pid(conn)
+            self.backend_pid(conn)
+
+        patched_is_usable.assert_called_once_with()
+
+    def test_no_check_without_persistent_connections(self):
+        conn = self.new_connection(CONN_MAX_AGE=0)
+
+        self.assertFalse(conn.health_check_enabled)
+
+    def test_inherited_connection_dropped_after_fork(self):
+        """Test a forked worker opens its own connection and leaves the
+        parent's open.
+        """
+        conn = self.new_connection()
+        pid = self.backend_pid(conn)
+        inherited = conn.connection
+        self.addCleanup(inherited.close)
+
+        with patch.object(base.connections, 'all', return_value=[conn]):
+            base._drop_inherited_connections()
+
+        self.assertIsNone(conn.connection)
+        self.assertFalse(inherited.closed)
+        self.assertNotEqual(self.backend_pid(conn), pid)
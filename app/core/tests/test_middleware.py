@@ -0,0 +1,82 @@
+import gzip
+
+import brotli
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from core.middleware import CompressionMiddleware, choose_encoding
+
+
+BODY = b'{"title":"Soup","tags":[{"id":1,"name":"Vegan"}]}' * 100
+
+
+@override_settings(COMPRESSION_MIN_SIZE=1024)
+class CompressionMiddlewareTests(SimpleTestCase):
+    def process(self, response, accept_encoding='gzip, deflate, br'):
+        request = RequestFactory().get(
+            '/', HTTP_ACCEPT_ENCODING=accept_encoding
+        )
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def json_response(self, body=BODY):
+        response = HttpResponse(body, content_type='application/json')
+        response['ETag'] = '"v1"'
+        return response
+
+    def test_brotli_preferred(self):
+        """Test Brotli is chosen when the client accepts it."""
+        res = self.process(self.json_response())
+
+        self.assertEqual(res['Content-Encoding'], 'br')
+        self.assertEqual(brotli.decompress(res.content), BODY)
+        self.assertEqual(res['Content-Length'], str(len(res.content)))
+        self.assertEqual(res['Vary'], 'Accept-Encoding')
+        self.assertEqual(res['ETag'], 'W/"v1"')
+
+    def test_gzip(self):
+        """Test gzip is used for clients without Brotli."""
+        res = self.process(self.json_response(), 'gzip')
+
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(res.content), BODY)
+
+    def test_q_values(self):
+        """Test the q-values of Accept-Encoding decide the encoding."""
+        self.assertEqual(choose_encoding('br;q=0.5, gzip'), 'gzip')
+        self.assertEqual(choose_encoding('br;q=0, gzip;q=0'), None)
+        self.assertEqual(choose_encoding('*'), 'br')
+        self.assertEqual(choose_encoding('identity'), None)
+        self.assertEqual(choose_encoding(''), None)
+
+    def test_identity(self):
+        """Test the response is sent as is without an accepted encoding."""
+        res = self.process(self.json_response(), '')
+
+        self.assertFalse(res.has_header('Content-Encoding'))
+        self.assertEqual(res.content, BODY)
+        self.assertEqual(res['Vary'], 'Accept-Encoding')
+
+    def test_small_response(self):
+        """Test responses below the threshold are not compressed."""
+        res = self.process(self.json_response(b'{}'))
+
+        self.assertFalse(res.has_header('Content-Encoding'))
+
+    def test_incompressible_type(self):
+        """Test images are not compressed again."""
+        res = self.process(HttpResponse(BODY, content_type='image/jpeg'))
+
+        self.assertFalse(res.has_header('Content-Encoding'))
+
+    def test_streaming(self):
+        """Test streaming responses are compressed chunk by chunk."""
+        response = StreamingHttpResponse(
+            iter([BODY, BODY]), content_type='application/x-ndjson'
+        )
+
+        res = self.process(response)
+
+        self.assertEqual(res['Content-Encoding'], 'br')
+        self.assertEqual(
+            brotli.decompress(b''.join(res.streaming_content)), BODY * 2
+        )
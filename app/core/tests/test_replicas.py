@@ -0,0 +1,152 @@
+from decimal import Decimal
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.test import (
+    SimpleTestCase, TestCase, TransactionTestCase, override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core import replicas
+from core.models import Recipe
+
+
+RECIPE_URL = reverse('recipe:recipe-list')
+TAG_URL = reverse('recipe:tag-list')
+
+
+def create_recipe(user):
+    return Recipe.objects.create(
+        user=user, title='Soup', time_minutes=5, price=Decimal('2.00'),
+    )
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReplicaRouterTests(SimpleTestCase):
+    router = replicas.ReplicaRouter()
+
+    def test_reads_from_primary_by_default(self):
+        self.assertEqual(self.router.db_for_read(Recipe), DEFAULT_DB_ALIAS)
+
+    def test_reads_within_replica_block(self):
+        with replicas.read_from('replica1'):
+            self.assertEqual(self.router.db_for_read(Recipe), 'replica1')
+
+        self.assertEqual(self.router.db_for_read(Recipe), DEFAULT_DB_ALIAS)
+
+    def test_writes_to_primary(self):
+        """Test even instances read from a replica are saved on the
+        primary.
+        """
+        recipe = Recipe(title='Soup')
+        recipe._state.db = 'replica1'
+
+        with replicas.read_from('replica1'):
+            self.assertEqual(
+                self.router.db_for_write(Recipe, instance=recipe),
+                DEFAULT_DB_ALIAS,
+            )
+
+    def test_no_migrations_on_replicas(self):
+        self.assertFalse(self.router.allow_migrate('replica1', 'core'))
+        self.assertIsNone(self.router.allow_migrate(DEFAULT_DB_ALIAS, 'core'))
+
+
+@patch('core.replicas.choose_replica', return_value=DEFAULT_DB_ALIAS)
+class ReplicaReadViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            'replica@example.com', '12345'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_reads_from_replica(self, patched_choose):
+        """Test a list request picks a replica for its reads."""
+        self.client.get(RECIPE_URL)
+        self.client.get(TAG_URL)
+
+        self.assertEqual(patched_choose.call_count, 2)
+
+    def test_reads_within_transaction_from_primary(self, patched_choose):
+        """Test a transaction of the primary reads its own writes."""
+        router = replicas.ReplicaRouter()
+
+        with transaction.atomic(), replicas.read_from('replica1'):
+            self.assertEqual(router.db_for_read(Recipe), DEFAULT_DB_ALIAS)
+
+    def test_write_pins_to_primary(self, patched_choose):
+        """Test the requests following a write read from the primary."""
+        self.client.post(TAG_URL, {'name': 'Dinner'})
+        res = self.client.get(TAG_URL)
+
+        self.assertEqual(res.status_code, 200)
+        patched_choose.assert_not_called()
+        self.assertTrue(replicas.is_pinned(self.user.pk))
+
+    def test_pin_is_per_user(self, patched_choose):
+        replicas.pin_to_primary(self.user.pk)
+        other = get_user_model().objects.create_user(
+            'other@example.com', '12345'
+        )
+        self.client.force_authenticate(other)
+
+        self.client.get(RECIPE_URL)
+
+        patched_choose.assert_called_once_with()
+
+    def test_pin_expires(self, patched_choose):
+        with override_settings(DATABASE_REPLICA_PIN_SECONDS=0):
+            replicas.pin_to_primary(self.user.pk)
+
+        self.assertFalse(replicas.is_pinned(self.user.pk))
+
+
+@skipUnless(settings.DATABASE_REPLICAS, 'Needs DB_REPLICA_HOSTS.')
+class ReplicaDatabaseTests(TransactionTestCase):
+    """Test against a replica alias, which mirrors the test database."""
+
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()
+        self.replica = settings.DATABASE_REPLICAS[0]
+        settings_override = override_settings(
+            DATABASE_REPLICAS=[self.replica]
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = get_user_model().objects.create_user(
+            'replica@example.com', '12345'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_queries_replica(self):
+        create_recipe(self.user)
+
+        with CaptureQueriesContext(connections[self.replica]) as ctx:
+            res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertTrue(ctx.captured_queries)
+
+    def test_reads_own_write(self):
+        """Test a recipe just created is read back from the primary."""
+        self.client.post(RECIPE_URL, {
+            'title': 'Curry', 'time_minutes': 30, 'price': '5.00',
+        })
+
+        with CaptureQueriesContext(connections[self.replica]) as ctx:
+            res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(len(res.data['results']), 1)
+        self.assertFalse(ctx.captured_queries)
@@ -0,0 +1,312 @@
+import json
+from io import StringIO
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import DEFAULT_DB_ALIAS
+from django.test import (
+    SimpleTestCase, TestCase, TransactionTestCase, override_settings,
+)
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import shards
+from core.models import Recipe, StoredFile, Tag, UserShard
+
+
+RECIPE_URL = reverse('recipe:recipe-list')
+TAG_URL = reverse('recipe:tag-list')
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+def create_user(email='shard@example.com'):
+    return get_user_model().objects.create_user(email, '12345')
+
+
+class PlanRebalanceTests(SimpleTestCase):
+    def test_moves_even_out_loads(self):
+        moves = shards.plan_rebalance(
+            {'default': 5, 'shard1': 0, 'shard2': 1},
+            ['default', 'shard1', 'shard2'],
+        )
+
+        self.assertEqual(
+            moves, {('default', 'shard1'): 2, ('default', 'shard2'): 1},
+        )
+
+    def test_closed_shards_not_filled(self):
+        moves = shards.plan_rebalance(
+            {'default': 4, 'shard1': 0}, ['default'],
+        )
+
+        self.assertEqual(moves, {})
+
+    def test_balanced(self):
+        moves = shards.plan_rebalance({'default': 3, 'shard1': 2}, ['shard1'])
+
+        self.assertEqual(moves, {})
+
+
+@override_settings(DATABASE_SHARDS=['default', 'shard1'])
+class ShardRouterTests(SimpleTestCase):
+    router = shards.ShardRouter()
+
+    def test_default_shard_outside_a_scope(self):
+        self.assertEqual(self.router.db_for_write(Recipe), DEFAULT_DB_ALIAS)
+        self.assertIsNone(self.router.db_for_read(Recipe))
+
+    def test_scoped_to_shard(self):
+        with shards.using_shard('shard1'):
+            self.assertEqual(self.router.db_for_read(Tag), 'shard1')
+            self.assertEqual(
+                self.router.db_for_write(Recipe.tags.through), 'shard1',
+            )
+
+    def test_users_not_sharded(self):
+        with shards.using_shard('shard1'):
+            self.assertIsNone(self.router.db_for_read(get_user_model()))
+
+    def test_related_rows_follow_instance(self):
+        """Test the related rows of an instance are on its shard."""
+        recipe = Recipe(user_id=1)
+        recipe._state.db = 'shard1'
+
+        self.assertEqual(
+            self.router.db_for_read(Tag, instance=recipe), 'shard1',
+        )
+
+    @patch('core.shards.get_user_shard', return_value=('shard1', False))
+    def test_rows_of_user_on_their_shard(self, patched_get_user_shard):
+        user = get_user_model()(pk=1)
+
+        self.assertEqual(
+            self.router.db_for_read(Recipe, instance=user), 'shard1',
+        )
+        patched_get_user_shard.assert_called_once_with(1)
+
+    @override_settings(DATABASE_SHARDS=[])
+    def test_no_routing_without_shards(self):
+        with shards.using_shard('shard1'):
+            self.assertIsNone(self.router.db_for_write(Recipe))
+
+
+class UserShardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        # User ids are reused after the rollback, their shards must not be.
+        self.addCleanup(cache.clear)
+
+    @override_settings(DATABASE_SHARDS=[])
+    def test_no_mapping_without_shards(self):
+        create_user()
+
+        self.assertFalse(UserShard.objects.exists())
+
+    @override_settings(
+        DATABASE_SHARDS=['default'], DATABASE_SHARDS_OPEN=['default'],
+    )
+    def test_new_user_placed(self):
+        user = create_user()
+
+        self.assertEqual(user.shard.shard, DEFAULT_DB_ALIAS)
+        self.assertEqual(shards.shard_loads(), {'default': 1})
+
+    @override_settings(
+        DATABASE_SHARDS=['default'], DATABASE_SHARDS_OPEN=['default'],
+    )
+    def test_writes_refused_while_moving(self):
+        """Test a user's writes are refused while their data is moved, and
+        their reads are served.
+        """
+        user = create_user()
+        UserShard.objects.filter(user=user).update(moving=True)
+        client = APIClient()
+        client.force_authenticate(user)
+
+        res = client.post(TAG_URL, {'name': 'Dinner'})
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertFalse(Tag.objects.exists())
+        self.assertEqual(client.get(TAG_URL).status_code, status.HTTP_200_OK)
+
+    @override_settings(
+        DATABASE_SHARDS=['default'], DATABASE_SHARDS_OPEN=['default'],
+        USER_SHARD_CACHE_TIMEOUT=300,
+    )
+    def test_writes_look_up_shard_again(self):
+        """Test writes do not trust the cached shard of the user."""
+        user = create_user()
+        self.assertEqual(
+            shards.get_user_shard(user.pk), (DEFAULT_DB_ALIAS, False),
+        )
+        UserShard.objects.filter(user=user).update(moving=True)
+        client = APIClient()
+        client.force_authenticate(user)
+
+        res = client.post(TAG_URL, {'name': 'Dinner'})
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    @override_settings(
+        DATABASE_SHARDS=['default'], DATABASE_SHARDS_OPEN=['default'],
+    )
+    def test_move_to_own_shard(self):
+        user = create_user()
+
+        self.assertEqual(shards.move_user(user, DEFAULT_DB_ALIAS), 0)
+
+    def test_move_to_unknown_shard_rejected(self):
+        create_user()
+
+        with self.assertRaises(CommandError):
+            call_command(
+                'move_user_shard', 'shard@example.com', '--to', 'nowhere',
+                stdout=StringIO(),
+            )
+
+
+@skipUnless(len(settings.DATABASE_SHARDS) > 1, 'Needs DB_SHARDS.')
+class ShardDatabaseTests(TransactionTestCase):
+    """Test against the default database and the first other shard."""
+
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.shard = settings.DATABASE_SHARDS[1]
+        settings_override = override_settings(
+            DATABASE_SHARDS=[DEFAULT_DB_ALIAS, self.shard],
+            DATABASE_SHARDS_OPEN=[self.shard],
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_recipe(self, **payload):
+        payload = {
+            'title': 'Curry', 'time_minutes': 30, 'price': '5.00',
+            'tags': [{'name': 'Spicy'}], 'ingredients': [{'name': 'Rice'}],
+            **payload,
+        }
+        res = self.client.post(RECIPE_URL, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        return res.data
+
+    def test_new_user_placed_on_open_shard(self):
+        """Test a new user gets a stand-in on the shard they are put on."""
+        self.assertEqual(self.user.shard.shard, self.shard)
+        stand_in = get_user_model().objects.using(self.shard).get(
+            pk=self.user.pk,
+        )
+        self.assertFalse(stand_in.is_active)
+        self.assertFalse(stand_in.has_usable_password())
+
+    def test_data_written_to_users_shard(self):
+        data = self.create_recipe()
+
+        recipe = Recipe.objects.using(self.shard).get(pk=data['id'])
+        self.assertEqual(
+            [tag.name for tag in recipe.tags.all()], ['Spicy'],
+        )
+        self.assertFalse(Recipe.objects.using(DEFAULT_DB_ALIAS).exists())
+        self.assertGreaterEqual(data['id'], shards.SHARD_ID_SPAN)
+
+        res = self.client.get(RECIPE_URL)
+        self.assertEqual([r['id'] for r in res.data['results']], [data['id']])
+
+    def test_export_from_users_shard(self):
+        """Test the streamed export reads the user's shard."""
+        data = self.create_recipe()
+
+        res = self.client.get(EXPORT_URL)
+
+        rows = [
+            json.loads(line)
+            for line in b''.join(res.streaming_content).decode().splitlines()
+        ]
+        self.assertEqual([row['id'] for row in rows], [data['id']])
+        self.assertEqual(rows[0]['tags'], data['tags'])
+
+    def test_move_user(self):
+        """Test a move keeps the ids, links and images and empties the old
+        shard.
+        """
+        data = self.create_recipe()
+        Recipe.objects.using(self.shard).update(image='uploads/recipe/a.jpg')
+        StoredFile.objects.create(name='uploads/recipe/a.jpg', refcount=1)
+
+        with override_settings(TASKS_EAGER=True):
+            call_command(
+                'move_user_shard', self.user.email, '--to', DEFAULT_DB_ALIAS,
+                stdout=StringIO(),
+            )
+
+        self.assertFalse(Recipe.objects.using(self.shard).exists())
+        self.assertFalse(Tag.objects.using(self.shard).exists())
+        self.assertFalse(
+            get_user_model().objects.using(self.shard).filter(
+                pk=self.user.pk,
+            ).exists()
+        )
+        res = self.client.get(RECIPE_URL)
+        recipe = res.data['results'][0]
+        self.assertEqual(recipe['id'], data['id'])
+        self.assertEqual(recipe['tags'], data['tags'])
+        self.assertEqual(recipe['ingredients'], data['ingredients'])
+        self.assertEqual(
+            Recipe.objects.get(pk=data['id']).image, 'uploads/recipe/a.jpg',
+        )
+        self.assertEqual(StoredFile.objects.get().refcount, 1)
+
+    @patch('core.shards.MOVE_BATCH_SIZE', 1)
+    def test_move_user_in_pages(self):
+        """Test a move copies every page of the user's data."""
+        first = self.create_recipe()
+        second = self.create_recipe(
+            title='Rice', tags=[{'name': 'Spicy'}, {'name': 'Quick'}],
+        )
+
+        moved = shards.move_user(self.user, DEFAULT_DB_ALIAS)
+
+        self.assertEqual(moved, 2)
+        self.assertFalse(Recipe.objects.using(self.shard).exists())
+        res = self.client.get(RECIPE_URL)
+        self.assertEqual(
+            {r['id']: len(r['tags']) for r in res.data['results']},
+            {first['id']: 1, second['id']: 2},
+        )
+
+    def test_rebalance(self):
+        """Test users are moved onto an emptier open shard."""
+        with override_settings(DATABASE_SHARDS_OPEN=[DEFAULT_DB_ALIAS]):
+            others = [create_user(f'user{i}@example.com') for i in range(3)]
+        self.create_recipe()
+
+        with override_settings(DATABASE_SHARDS_OPEN=settings.DATABASE_SHARDS):
+            call_command('rebalance_shards', stdout=StringIO())
+
+        self.assertEqual(
+            sorted(shards.shard_loads().values())[-2:], [2, 2],
+        )
+        others[-1].shard.refresh_from_db()
+        self.assertEqual(others[-1].shard.shard, self.shard)
+
+    def test_user_deleted_with_data(self):
+        self.create_recipe()
+
+        self.user.delete()
+
+        self.assertFalse(Recipe.objects.using(self.shard).exists())
+        self.assertFalse(
+            get_user_model().objects.using(self.shard).exists()
+        )
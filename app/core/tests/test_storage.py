@@ -0,0 +1,135 @@
+import gzip
+import hashlib
+import os
+import shutil
+import tempfile
+
+import brotli
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.test import SimpleTestCase, TestCase
+
+from core.models import StoredFile
+from core.storage import (
+    CompressedManifestStaticFilesStorage, ContentAddressedStorage,
+)
+
+
+class ContentAddressedStorageTests(TestCase):
+    def setUp(self):
+        self.location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.location)
+        self.storage = ContentAddressedStorage(location=self.location)
+
+    def test_named_by_content_hash(self):
+        """Test a file is named by the SHA-256 of its content."""
+        digest = hashlib.sha256(b'content').hexdigest()
+
+        name = self.storage.save('uploads/photo.JPG', ContentFile(b'content'))
+
+        self.assertEqual(name, f'uploads/{digest[:2]}/{digest}.jpg')
+        with self.storage.open(name) as stored:
+            self.assertEqual(stored.read(), b'content')
+
+    def test_identical_content_stored_once(self):
+        """Test saving the same content twice shares one file."""
+        first = self.storage.save('uploads/a.jpg', ContentFile(b'content'))
+        second = self.storage.save('uploads/b.jpg', ContentFile(b'content'))
+
+        self.assertEqual(first, second)
+        self.assertEqual(self.storage.references(first), 2)
+        self.assertEqual(
+            len(os.listdir(os.path.dirname(self.storage.path(first)))), 1
+        )
+
+    def test_different_content_stored_apart(self):
+        """Test different content gets different names."""
+        first = self.storage.save('uploads/a.jpg', ContentFile(b'one'))
+        second = self.storage.save('uploads/a.jpg', ContentFile(b'two'))
+
+        self.assertNotEqual(first, second)
+
+    def test_delete_keeps_referenced_file(self):
+        """Test the file is deleted with its last reference only."""
+        name = self.storage.save('uploads/a.jpg', ContentFile(b'content'))
+        self.storage.save('uploads/b.jpg', ContentFile(b'content'))
+
+        self.storage.delete(name)
+
+        self.assertTrue(self.storage.exists(name))
+        self.assertEqual(self.storage.references(name), 1)
+
+        self.storage.delete(name)
+
+        self.assertFalse(self.storage.exists(name))
+        self.assertFalse(StoredFile.objects.filter(name=name).exists())
+
+    def test_delete_uncounted_file(self):
+        """Test a file stored before the counting is deleted right away."""
+        path = os.path.join(self.location, 'uploads', 'legacy.jpg')
+        os.makedirs(os.path.dirname(path))
+        with open(path, 'wb') as legacy:
+            legacy.write(b'content')
+
+        self.storage.delete('uploads/legacy.jpg')
+
+        self.assertFalse(os.path.exists(path))
+
+    def test_no_temporary_files_left(self):
+        """Test only the stored file remains in the directory."""
+        self.storage.save('uploads/a.jpg', ContentFile(b'content'))
+        self.storage.save('uploads/b.jpg', ContentFile(b'content'))
+
+        self.assertEqual(
+            os.listdir(os.path.join(self.location, 'uploads')),
+            [hashlib.sha256(b'content').hexdigest()[:2]],
+        )
+
+
+class CompressedManifestStaticFilesStorageTests(SimpleTestCase):
+    css = b'body { background: url("bg.png"); }\n' * 20
+
+    def setUp(self):
+        self.location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.location)
+        self.storage = CompressedManifestStaticFilesStorage(
+            location=self.location
+        )
+
+    def collect(self, files):
+        source = FileSystemStorage(location=tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, source.location)
+        for name, content in files.items():
+            source.save(name, ContentFile(content))
+            self.storage.save(name, ContentFile(content))
+        paths = {name: (source, name) for name in files}
+        for _, _, processed in self.storage.post_process(paths):
+            if isinstance(processed, Exception):
+                raise processed
+
+    def test_hashed_and_compressed(self):
+        """Test text files get hashed names and gzip and Brotli copies."""
+        self.collect({'site.css': self.css, 'bg.png': b'png'})
+
+        hashed = self.storage.stored_name('site.css')
+        self.assertRegex(hashed, r'^site\.[0-9a-f]{12}\.css$')
+        with self.storage.open(hashed + '.gz') as compressed:
+            content = gzip.decompress(compressed.read())
+        with self.storage.open(hashed + '.br') as compressed:
+            self.assertEqual(brotli.decompress(compressed.read()), content)
+        self.assertIn(self.storage.stored_name('bg.png').encode(), content)
+
+    def test_binary_and_small_files_not_compressed(self):
+        """Test images and files too small to gain are left alone."""
+        self.collect({'bg.png': b'png' * 200, 'tiny.js': b'var a;'})
+
+        for name in ('bg.png', 'tiny.js'):
+            self.assertFalse(
+                self.storage.exists(self.storage.stored_name(name) + '.gz')
+            )
+
+    def test_uncollected_file_keeps_name(self):
+        """Test a file missing from the manifest is not an error."""
+        self.assertEqual(
+            self.storage.stored_name('missing.css'), 'missing.css'
+        )
@@ -0,0 +1,41 @@
+from unittest.mock import ANY, MagicMock, patch
+
+from django.test import TestCase, override_settings
+
+from core import tasks
+
+
+class TaskQueueTests(TestCase):
+    @override_settings(TASKS_EAGER=False)
+    @patch('core.tasks.get_executor')
+    def test_task_queued_after_commit(self, patched_get_executor):
+        """Test a task is handed to the pool only once the data commits."""
+        func = MagicMock()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            tasks.enqueue(func, 1, key='value')
+            patched_get_executor.assert_not_called()
+
+        patched_get_executor.return_value.submit.assert_called_once_with(
+            ANY, tasks._run, func, (1,), {'key': 'value'}
+        )
+        func.assert_not_called()
+
+    @override_settings(TASKS_EAGER=True)
+    def test_eager_task_runs_in_caller(self):
+        func = MagicMock()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            tasks.enqueue(func, 1)
+
+        func.assert_called_once_with(1)
+
+    @patch('core.tasks.close_old_connections')
+    def test_failing_task_logged(self, patched_close):
+        """Test an exception in a background task is logged, not raised."""
+        func = MagicMock(side_effect=ValueError, __qualname__='broken')
+
+        with self.assertLogs('core.tasks', level='ERROR'):
+            tasks._run(func, (), {})
+
+        self.assertEqual(patched_close.call_count, 2)
@@ -0,0 +1,81 @@
+import os
+import shutil
+import tempfile
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+
+def media_url(path):
+    return reverse('media', args=[path])
+
+
+class ServeMediaTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(shutil.rmtree, self.media_root)
+
+        os.makedirs(os.path.join(self.media_root, 'uploads'))
+        self.path = os.path.join(self.media_root, 'uploads', 'photo.jpg')
+        with open(self.path, 'wb') as photo:
+            photo.write(b'jpeg')
+
+    def test_cached_as_immutable(self):
+        """Test media may be cached for good."""
+        res = self.client.get(media_url('uploads/photo.jpg'))
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(
+            res['Cache-Control'], 'public, max-age=31536000, immutable'
+        )
+
+    @override_settings(MEDIA_OFFLOAD='')
+    def test_streamed_without_offload(self):
+        """Test the file is sent by Django when no offload is set up."""
+        res = self.client.get(media_url('uploads/photo.jpg'))
+
+        self.assertEqual(b''.join(res.streaming_content), b'jpeg')
+        self.assertEqual(res['Content-Type'], 'image/jpeg')
+
+    @override_settings(
+        MEDIA_OFFLOAD='nginx', MEDIA_ACCEL_REDIRECT_URL='/internal/media/',
+    )
+    def test_nginx_offload(self):
+        """Test nginx is told to send the file."""
+        res = self.client.get(media_url('uploads/photo.jpg'))
+
+        self.assertEqual(
+            res['X-Accel-Redirect'], '/internal/media/uploads/photo.jpg'
+        )
+        self.assertEqual(res['Content-Type'], 'image/jpeg')
+        self.assertEqual(res.content, b'')
+
+    @override_settings(MEDIA_OFFLOAD='uwsgi')
+    def test_uwsgi_offload(self):
+        """Test uWSGI is told to send the file."""
+        res = self.client.get(media_url('uploads/photo.jpg'))
+
+        self.assertEqual(res['X-Sendfile'], self.path)
+        self.assertEqual(res.content, b'')
+
+    def test_missing_file(self):
+        """Test a missing file or a directory is not found."""
+        for path in ('uploads/other.jpg', 'uploads', ''):
+            res = self.client.get(media_url(path))
+
+            self.assertEqual(res.status_code, 404)
+
+    def test_path_outside_media_root(self):
+        """Test no file outside the media directory is served."""
+        res = self.client.get(media_url('../../etc/passwd'))
+
+        self.assertEqual(res.status_code, 404)
+
+    def test_post_not_allowed(self):
+        """Test media is read only."""
+        res = self.client.post(media_url('uploads/photo.jpg'))
+
+        self.assertEqual(res.status_code, 405)
@@ -1,3 +1,57 @@
-from django.shortcuts import render
+"""
+Serving of the uploaded media.
 
+Upload names never get other content (they are content hashes, or uuids
+for older uploads), so media is cached for a year as immutable. The file
+bytes are not sent by the Python worker: with `MEDIA_OFFLOAD` set to
+`nginx` the response carries an `X-Accel-Redirect` to the internal
+`MEDIA_ACCEL_REDIRECT_URL` location, with `uwsgi` an `X-Sendfile` header
+that uWSGI serves from its offload threads (see scripts/run.sh). Without
+an offload, as in development, the file is streamed by Django.
+"""
+import mimetypes
+import os
+from urllib.parse import quote
 
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import require_safe
+
+
+MEDIA_CACHE_MAX_AGE = 365 * 24 * 60 * 60
+
+
+@require_safe
+def serve_media(request, path):
+    try:
+        full_path = default_storage.path(path)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+
+    offload = settings.MEDIA_OFFLOAD
+    if offload == 'nginx':
+        response = HttpResponse()
+        response['X-Accel-Redirect'] = (
+            settings.MEDIA_ACCEL_REDIRECT_URL + quote(path)
+        )
+    elif offload == 'uwsgi':
+        response = HttpResponse()
+        response['X-Sendfile'] = full_path
+    else:
+        response = FileResponse(open(full_path, 'rb'))
+
+    if offload:
+        # The web server serves the file; only its type is set here.
+        content_type, encoding = mimetypes.guess_type(path)
+        response['Content-Type'] = content_type or 'application/octet-stream'
+        if encoding:
+            response['Content-Encoding'] = encoding
+    patch_cache_control(
+        response, public=True, max_age=MEDIA_CACHE_MAX_AGE, immutable=True,
+    )
+    return response
@@ -0,0 +1,283 @@
+"""
+Benchmarks of the recipe API, run by `manage.py benchmark`.
+
+Every suite seeds its own data set for a throwaway user, times the
+implementations it compares and checks they return the same result. The
+benchmark command rolls everything back afterwards.
+"""
+import random
+import statistics
+import time
+from decimal import Decimal
+from itertools import product
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.db.models import Prefetch
+from django.utils.text import compress_string
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from core import middleware
+from core.models import Recipe, Tag, Ingredient
+from .bulk import chunked
+from .filters import MATCH_ALL, MATCH_ANY, filter_by_related
+from .listing import recipe_list_rows, recipe_list_values
+from .renderers import FastJSONRenderer
+from .serializers import RecipeDetailSerializer, RecipeSerializer
+
+
+SEED_CHUNK_SIZE = 5000
+
+
+class BenchmarkError(Exception):
+    """The compared implementations disagreed on the result."""
+
+
+def _bulk_create(model, objs):
+    """Bulk insert `objs` and return the created rows with primary keys."""
+    created = []
+    for chunk in chunked(objs, SEED_CHUNK_SIZE):
+        created.extend(model.objects.bulk_create(chunk))
+    if created and created[0].pk is None:
+        # Backends that can't return ids from bulk inserts, e.g. SQLite.
+        user = created[0].user_id
+        created = list(model.objects.filter(user_id=user).order_by('id'))
+    return created
+
+
+def _link(descriptor, column, recipes, items, per_recipe, rng):
+    through = descriptor.through
+    for chunk in chunked(recipes, SEED_CHUNK_SIZE):
+        through.objects.bulk_create(
+            through(recipe_id=recipe.pk, **{f'{column}_id': item.pk})
+            for recipe in chunk
+            for item in rng.sample(items, per_recipe)
+        )
+
+
+def seed(recipes, tags, ingredients, per_recipe=3, email='bench@example.com'):
+    """Create a user with `recipes` recipes linked to random tags and
+    ingredients and return the user.
+    """
+    rng = random.Random(recipes)
+    user = get_user_model().objects.create_user(email, 'benchmark')
+    recipe_rows = _bulk_create(Recipe, (
+        Recipe(
+            user=user, title=f'Recipe {i}', description=f'Description {i}',
+            time_minutes=rng.randint(5, 120), price=Decimal('5.00'),
+        )
+        for i in range(recipes)
+    ))
+    tag_rows = _bulk_create(
+        Tag, (Tag(user=user, name=f'Tag {i}') for i in range(tags))
+    )
+    ingredient_rows = _bulk_create(Ingredient, (
+        Ingredient(user=user, name=f'Ingredient {i}')
+        for i in range(ingredients)
+    ))
+    _link(Recipe.tags, 'tag', recipe_rows, tag_rows, per_recipe, rng)
+    _link(
+        Recipe.ingredients, 'ingredient',
+        recipe_rows, ingredient_rows, per_recipe, rng,
+    )
+    with connection.cursor() as cursor:
+        # Give the planner statistics of the fresh rows.
+        cursor.execute('ANALYZE')
+    return user
+
+
+def measure(func, repeat):
+    """Call `func` `repeat` times; return the median milliseconds and the
+    last result.
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), result
+
+
+def compare(name, implementations, repeat, unit='rows'):
+    """Time each of `implementations`, a list of `(label, func)` pairs.
+
+    Yields one `(name, label, milliseconds, size, unit)` tuple per
+    implementation, the size being the length of its result, and raises
+    `BenchmarkError` when they return different results.
+    """
+    expected = None
+    for label, func in implementations:
+        ms, result = measure(func, repeat)
+        if expected is None:
+            expected = result
+        elif result != expected:
+            raise BenchmarkError(
+                f'{name}: {label} returned a different result.'
+            )
+        yield name, label, ms, len(result), unit
+
+
+def _page(queryset):
+    """Ids of the first page of `queryset`, as the recipe list reads it."""
+    page = queryset.defer('search_vector').order_by('-id')[
+        :settings.API_PAGE_SIZE + 1
+    ]
+    return [recipe.pk for recipe in page]
+
+
+def _all(queryset):
+    """Ids of every recipe in `queryset`, as the export and ETag read it."""
+    return sorted(recipe.pk for recipe in queryset.defer('search_vector'))
+
+
+def _join_filter(queryset, field, ids, match):
+    """The former filter: one join per required id, then DISTINCT."""
+    if match == MATCH_ANY:
+        return queryset.filter(**{f'{field}__id__in': ids}).distinct()
+    for pk in ids:
+        queryset = queryset.filter(**{f'{field}__id': pk})
+    return queryset.distinct()
+
+
+def filters_suite(options):
+    """The tags and ingredients filters in either match mode."""
+    user = seed(
+        options['recipes'], options['tags'], options['tags'],
+        per_recipe=options['per_recipe'],
+    )
+    recipes = Recipe.objects.filter(user=user)
+    for field, model in (('tags', Tag), ('ingredients', Ingredient)):
+        ids = list(
+            model.objects.filter(user=user).values_list('id', flat=True)[:2]
+        )
+        for match, read in product((MATCH_ANY, MATCH_ALL), (_page, _all)):
+            yield from compare(f'{field} match={match} {read.__name__[1:]}', [
+                ('join', lambda: read(
+                    _join_filter(recipes, field, ids, match)
+                )),
+                ('exists', lambda: read(
+                    filter_by_related(recipes, field, ids, match)
+                )),
+            ], options['repeat'])
+
+
+def rendering_suite(options):
+    """Serializing a page of recipe details, rendering it as JSON and the
+    bytes it takes on the wire in each encoding.
+    """
+    user = seed(
+        options['recipes'], options['tags'], options['tags'],
+        per_recipe=options['per_recipe'],
+    )
+    recipes = list(
+        Recipe.objects.filter(user=user).defer('search_vector')
+        .prefetch_related('tags', 'ingredients')
+        .order_by('-id')[:settings.API_PAGE_SIZE]
+    )
+    context = {'request': APIRequestFactory().get('/api/recipe/recipes/')}
+    case = f'{len(recipes)} details'
+    repeat = options['repeat']
+
+    ms, data = measure(
+        lambda: RecipeDetailSerializer(
+            recipes, many=True, context=context,
+        ).data,
+        repeat,
+    )
+    yield f'{case} serialize', 'drf', ms, len(data), 'rows'
+
+    yield from compare(f'{case} render', [
+        ('json', lambda: JSONRenderer().render(data)),
+        ('fast', lambda: FastJSONRenderer().render(data)),
+    ], repeat, unit='bytes')
+
+    body = FastJSONRenderer().render(data)
+    encodings = {'identity': bytes, 'gzip': compress_string}
+    if 'br' in middleware.available_encodings():
+        encodings['br'] = middleware.brotli_compress
+    for label, compress in encodings.items():
+        ms, wire = measure(lambda: compress(body), repeat)
+        yield f'{case} wire', label, ms, len(wire), 'bytes'
+
+
+def listing_suite(options):
+    """A page of the recipe list through the serializer and through the
+    `.values()` read path, both rendered as JSON.
+    """
+    user = seed(
+        options['recipes'], options['tags'], options['tags'],
+        per_recipe=options['per_recipe'],
+    )
+    page = Recipe.objects.filter(user=user).defer(
+        'search_vector'
+    ).order_by('-id')[:settings.API_PAGE_SIZE]
+    request = APIRequestFactory().get('/api/recipe/recipes/')
+    renderer = FastJSONRenderer()
+
+    def serialized():
+        recipes = page.prefetch_related(
+            Prefetch('tags', queryset=Tag.objects.order_by('id')),
+            Prefetch(
+                'ingredients', queryset=Ingredient.objects.order_by('id'),
+            ),
+        )
+        return renderer.render(RecipeSerializer(
+            recipes, many=True, context={'request': request},
+        ).data)
+
+    def values():
+        rows = list(recipe_list_values(page))
+        return renderer.render(recipe_list_rows(rows, request))
+
+    yield from compare(f'{settings.API_PAGE_SIZE} recipes list page', [
+        ('serializer', serialized),
+        ('values', values),
+    ], options['repeat'], unit='bytes')
+
+
+def connections_suite(options):
+    """The database work of a request returning one row, on a connection
+    opened per request and on a persistent one with and without the health
+    check.
+    """
+    def request_cycle(max_age, health_checks):
+        conn = connections.create_connection(DEFAULT_DB_ALIAS)
+        conn.settings_dict = {
+            **conn.settings_dict,
+            'CONN_MAX_AGE': max_age,
+            'CONN_HEALTH_CHECKS': health_checks,
+        }
+
+        def request():
+            # What the request_started and request_finished signals do.
+            conn.close_if_unusable_or_obsolete()
+            with conn.cursor() as cursor:
+                cursor.execute('SELECT 1')
+                rows = cursor.fetchall()
+            conn.close_if_unusable_or_obsolete()
+            return rows
+
+        return conn, request
+
+    cycles = {
+        'new': request_cycle(0, False),
+        'reused': request_cycle(None, False),
+        'checked': request_cycle(None, True),
+    }
+    try:
+        yield from compare('request', [
+            (label, request) for label, (_, request) in cycles.items()
+        ], options['repeat'])
+    finally:
+        for conn, _ in cycles.values():
+            conn.close()
+
+
+SUITES = {
+    'connections': connections_suite,
+    'filters': filters_suite,
+    'listing': listing_suite,
+    'rendering': rendering_suite,
+}
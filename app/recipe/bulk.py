@@ -0,0 +1,171 @@
+"""
+Bulk import and export of recipes.
+"""
+from itertools import islice
+
+from django.db import connections, router, transaction
+
+from core.models import Recipe, Tag, Ingredient
+from core.search import update_search_vectors
+from core.signals import touch
+from . import serializers
+from .cache import bump_generation
+from .listing import related_items
+
+
+IMPORT_CHUNK_SIZE = 500
+MAX_REPORTED_ERRORS = 100
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_FIELDS = [
+    'id', 'title', 'description', 'time_minutes', 'price', 'link',
+]
+
+
+def chunked(iterable, size):
+    """Yield lists of up to `size` items from `iterable`."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def bulk_create_with_ids(model, objs):
+    """Bulk insert `objs` and make sure every object has its primary key."""
+    connection = connections[router.db_for_write(model)]
+    if connection.features.can_return_rows_from_bulk_insert:
+        return model.objects.bulk_create(objs)
+    # Without RETURNING there is no way to map inserted rows back to the
+    # objects, so fall back to one INSERT per object.
+    for obj in objs:
+        obj.save(force_insert=True)
+    return objs
+
+
+class RecipeImporter:
+    """Validate and write a stream of recipe rows in fixed size chunks.
+
+    Rows are `(line_number, data, error)` tuples as produced by
+    `NDJSONParser`. Each chunk is validated with `RecipeDetailSerializer`
+    and its valid rows are written with one bulk insert per table inside a
+    transaction. Invalid rows are reported and skipped without aborting
+    the rest of the import. Only one chunk is held in memory at a time.
+    """
+
+    def __init__(self, user, chunk_size=IMPORT_CHUNK_SIZE):
+        self.user = user
+        self.chunk_size = chunk_size
+        self.created = 0
+        self.failed = 0
+        self.errors = []
+
+    def run(self, rows):
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= self.chunk_size:
+                self._import_chunk(chunk)
+                chunk = []
+        if chunk:
+            self._import_chunk(chunk)
+
+        return {
+            'created': self.created,
+            'failed': self.failed,
+            'errors': self.errors,
+        }
+
+    def _report(self, line, errors):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'errors': errors})
+
+    def _validate(self, chunk):
+        valid = []
+        for line, data, error in chunk:
+            if error:
+                self._report(line, {'non_field_errors': [error]})
+                continue
+            serializer = serializers.RecipeDetailSerializer(data=data)
+            if serializer.is_valid():
+                valid.append(serializer.validated_data)
+            else:
+                self._report(line, serializer.errors)
+        return valid
+
+    def _import_chunk(self, chunk):
+        rows = self._validate(chunk)
+        if not rows:
+            return
+
+        with transaction.atomic(using=router.db_for_write(Recipe)):
+            recipes = bulk_create_with_ids(Recipe, [
+                Recipe(
+                    user=self.user,
+                    **{
+                        key: value for key, value in row.items()
+                        if key not in ('tags', 'ingredients')
+                    },
+                )
+                for row in rows
+            ])
+            self._link(Recipe.tags, Tag, 'tag_id', rows, recipes, 'tags')
+            self._link(
+                Recipe.ingredients, Ingredient, 'ingredient_id',
+                rows, recipes, 'ingredients',
+            )
+            update_search_vectors(
+                Recipe.objects.filter(pk__in=[recipe.id for recipe in recipes])
+            )
+        self.created += len(recipes)
+        # Bulk inserts send no signals, so invalidate cached lists here.
+        bump_generation(self.user.id)
+
+    def _link(self, descriptor, model, column, rows, recipes, key):
+        """Attach the nested `key` items of every row with one insert."""
+        def name_keys(items):
+            return dict.fromkeys(
+                serializers.name_key(item['name']) for item in items
+            )
+
+        items = [item for row in rows for item in row.get(key, [])]
+        # get_or_create_by_name returns a row per distinct name key.
+        objs = dict(zip(
+            name_keys(items),
+            serializers.get_or_create_by_name(model, self.user, items),
+        ))
+        through = descriptor.through
+        links = []
+        for row, recipe in zip(rows, recipes):
+            # Names the database folds together share a row.
+            ids = dict.fromkeys(
+                objs[name].id for name in name_keys(row.get(key, []))
+            )
+            links.extend(
+                through(recipe_id=recipe.id, **{column: pk}) for pk in ids
+            )
+        through.objects.bulk_create(links)
+        # Keep the assigned_only versions right, as add() would have.
+        touch(model.objects.filter(pk__in=[obj.id for obj in objs.values()]))
+
+
+def iter_export_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield every recipe in `queryset` as a plain dict, oldest first.
+
+    Recipes are read through a server-side cursor and their tags and
+    ingredients are fetched with one query per relation for each chunk,
+    so memory use is bounded by `chunk_size` rather than the export size.
+    """
+    recipes = queryset.order_by('id').values(*EXPORT_FIELDS).iterator(
+        chunk_size=chunk_size
+    )
+    for chunk in chunked(recipes, chunk_size):
+        ids = [row['id'] for row in chunk]
+        tags = related_items(Recipe.tags, 'tag', ids)
+        ingredients = related_items(Recipe.ingredients, 'ingredient', ids)
+        for row in chunk:
+            row['price'] = str(row['price'])
+            row['tags'] = tags[row['id']]
+            row['ingredients'] = ingredients[row['id']]
+            yield row
@@ -0,0 +1,96 @@
+"""
+Per-user caching of the list endpoints.
+
+Every user has a generation number in the cache that is part of the key of
+each of their cached list responses. Any change to one of the user's
+recipes, tags or ingredients bumps the generation, which orphans all of
+their cached lists at once; the orphans simply expire. Lists are only
+cached with an `API_CACHE_TIMEOUT`, which needs a cache shared by all
+workers for the generations to reach them.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.response import Response
+
+
+# Query parameters that change the content of a list response.
+CACHE_PARAMS = (
+    'tags', 'ingredients', 'match', 'assigned_only', 'with_counts', 'search',
+    'cursor', 'page_size',
+)
+ID_LIST_PARAMS = ('tags', 'ingredients')
+
+
+def _generation_key(user_id):
+    return f'recipe-api:generation:{user_id}'
+
+
+def get_generation(user_id):
+    """Return the current cache generation of `user_id`."""
+    key = _generation_key(user_id)
+    generation = cache.get(key)
+    if generation is None:
+        # Seed from the clock so a generation evicted from the cache never
+        # comes back with a number older entries were stored under.
+        cache.add(key, time.time_ns(), timeout=None)
+        generation = cache.get(key)
+    return generation
+
+
+def bump_generation(user_id):
+    """Invalidate every cached list of `user_id`."""
+    key = _generation_key(user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+
+
+def normalize_params(query_params):
+    """Return the cache relevant query parameters in a canonical form."""
+    params = []
+    for name in CACHE_PARAMS:
+        value = query_params.get(name)
+        if not value:
+            continue
+        if name in ID_LIST_PARAMS:
+            value = ','.join(sorted(set(value.split(','))))
+        params.append(f'{name}={value}')
+    return '&'.join(params)
+
+
+def list_cache_key(user_id, basename, query_params, origin=''):
+    """The cache key of a list; `origin`, the scheme and host, is part of
+    it as the data holds absolute URLs.
+    """
+    digest = hashlib.md5(
+        f'{origin}?{normalize_params(query_params)}'.encode()
+    ).hexdigest()
+    generation = get_generation(user_id)
+    return f'recipe-api:list:{user_id}:{generation}:{basename}:{digest}'
+
+
+class CachedListMixin:
+    """Serve `list()` from the per-user cache.
+
+    The serialized data is cached rather than the rendered response, so a
+    cached entry can be rendered in any format the client negotiates.
+    """
+
+    def list(self, request, *args, **kwargs):
+        if not settings.API_CACHE_TIMEOUT:
+            return super().list(request, *args, **kwargs)
+        key = list_cache_key(
+            request.user.id, self.basename, request.query_params,
+            request.build_absolute_uri('/'),
+        )
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+
+        response = super().list(request, *args, **kwargs)
+        cache.set(key, response.data, settings.API_CACHE_TIMEOUT)
+        return response
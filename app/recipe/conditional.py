@@ -0,0 +1,81 @@
+"""
+Conditional GET support for the recipe API.
+
+The ETag of a response is derived from the number of rows it covers and
+their newest `updated_at`, read with one aggregate query. A request whose
+If-None-Match still matches is answered with a 304 before any row is
+loaded or serialized.
+
+No Last-Modified is sent: the newest `updated_at` stays the same when an
+older row is deleted, and a date in whole seconds misses changes made
+within the same second.
+"""
+import hashlib
+
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+
+
+def get_etag(request, queryset):
+    """Return the ETag of `queryset` for `request`.
+
+    Returns None when the queryset is empty so a missing object still gets
+    its regular 404.
+    """
+    version = queryset.aggregate(
+        count=Count('pk'), last_modified=Max('updated_at'),
+    )
+    last_modified = version['last_modified']
+    if last_modified is None:
+        return None
+
+    digest = hashlib.sha1('|'.join([
+        request.get_full_path(),
+        request.accepted_media_type,
+        str(version['count']),
+        last_modified.isoformat(),
+    ]).encode()).hexdigest()
+    return quote_etag(digest)
+
+
+def conditional_response(request, queryset, handler, *args, **kwargs):
+    """Return a 304 for a fresh client copy, otherwise call `handler`."""
+    etag = get_etag(request, queryset)
+    response = None
+    if etag:
+        response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = handler(request, *args, **kwargs)
+
+    if etag and response.status_code in (200, 304):
+        response['ETag'] = etag
+    return response
+
+
+class ConditionalListMixin:
+    """Add ETag handling to `list()`."""
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        return conditional_response(
+            request, queryset, super().list, *args, **kwargs
+        )
+
+
+class ConditionalRetrieveMixin:
+    """Add ETag handling to `retrieve()`."""
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            queryset = self.filter_queryset(self.get_queryset()).filter(
+                **{self.lookup_field: kwargs[lookup_url_kwarg]}
+            )
+        except (TypeError, ValueError, ValidationError):
+            # get_object() answers a malformed lookup value with a 404.
+            return super().retrieve(request, *args, **kwargs)
+        return conditional_response(
+            request, queryset, super().retrieve, *args, **kwargs
+        )
@@ -0,0 +1,68 @@
+"""
+Filtering and counting by the links between recipes and their tags and
+ingredients.
+"""
+from django.db.models import Count, Exists, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+MATCH_ANY = 'any'
+MATCH_ALL = 'all'
+MATCH_MODES = (MATCH_ANY, MATCH_ALL)
+
+
+def filter_by_related(queryset, field, ids, match=MATCH_ANY):
+    """Filter `queryset` to recipes linked to any or all of `ids`.
+
+    `field` is a many-to-many field of the recipe, e.g. 'tags'. The links
+    are looked up on the through table in a subquery, so every recipe row
+    is read at most once and no DISTINCT is needed.
+    """
+    ids = set(ids)
+    descriptor = getattr(queryset.model, field)
+    column = descriptor.field.m2m_reverse_field_name()
+    links = descriptor.through.objects.filter(recipe_id=OuterRef('pk'))
+
+    if match == MATCH_ANY:
+        return queryset.filter(
+            Exists(links.filter(**{f'{column}_id__in': ids}))
+        )
+
+    # One semi-join per id; each probes the (recipe_id, <column>_id) unique
+    # index, so a page can be read in index order without aggregating every
+    # link of the ids first.
+    for pk in ids:
+        queryset = queryset.filter(
+            Exists(links.filter(**{f'{column}_id': pk}))
+        )
+    return queryset
+
+
+def _recipe_links(model):
+    """Through table rows linking recipes to the outer `model` row.
+
+    Returns the queryset and the name of its `model` column.
+    """
+    rel = model._meta.get_field('recipe')
+    column = rel.field.m2m_reverse_field_name()
+    links = rel.through.objects.filter(**{f'{column}_id': OuterRef('pk')})
+    return links, column
+
+
+def filter_assigned(queryset):
+    """Filter tags or ingredients to those linked to at least one recipe."""
+    links, _ = _recipe_links(queryset.model)
+    return queryset.filter(Exists(links))
+
+
+def annotate_recipe_count(queryset):
+    """Annotate tags or ingredients with the `recipe_count` using them.
+
+    The count is a correlated subquery, so the whole list is counted in its
+    one query and only the rows of the page being read are counted.
+    """
+    links, column = _recipe_links(queryset.model)
+    counts = links.order_by().values(f'{column}_id').annotate(
+        count=Count('*'),
+    ).values('count')
+    return queryset.annotate(recipe_count=Coalesce(Subquery(counts), 0))
@@ -0,0 +1,153 @@
+"""
+Resized renditions of recipe images.
+
+An upload is stored as is and answered right away; the renditions are
+produced by a background task. Every size is written as WebP and as JPEG
+for clients without WebP support. The renditions are re-encoded from the
+pixels only, so no EXIF data (camera, location) of the upload survives.
+"""
+import math
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from PIL import Image, ImageOps, features
+
+from core.models import Recipe
+from core.tasks import enqueue
+from .cache import bump_generation
+
+
+# Bounding boxes of the renditions, the aspect ratio is kept.
+RENDITION_SIZES = {
+    'thumbnail': (200, 200),
+    'medium': (800, 800),
+    'large': (1600, 1600),
+}
+JPEG_QUALITY = 85
+WEBP_QUALITY = 80
+
+
+def rendition_formats():
+    """The formats renditions are written in, WebP if Pillow supports it."""
+    formats = {'jpeg': ('JPEG', '.jpg')}
+    if features.check('webp'):
+        formats['webp'] = ('WEBP', '.webp')
+    return formats
+
+
+def rendition_name(size, extension):
+    # The storage names files by their content, so renditions of identical
+    # images are stored once.
+    return os.path.join(
+        'uploads', 'recipe', 'renditions', f'{size}{extension}',
+    )
+
+
+def _encode(image, pil_format):
+    buffer = BytesIO()
+    if pil_format == 'JPEG':
+        image.save(
+            buffer, 'JPEG', quality=JPEG_QUALITY, optimize=True,
+            progressive=True,
+        )
+    else:
+        image.save(buffer, pil_format, quality=WEBP_QUALITY, method=4)
+    return buffer.getvalue()
+
+
+def create_renditions(image_file):
+    """Write the renditions of `image_file`; return their storage names."""
+    with Image.open(image_file) as original:
+        # A JPEG is decoded at the smallest scale still covering the
+        # largest rendition, which the square boxes keep right whatever
+        # the EXIF orientation; a no-op for other formats.
+        box = max(RENDITION_SIZES.values())
+        scale = min(box[0] / original.width, box[1] / original.height)
+        original.draft('RGB', (
+            math.ceil(original.width * scale),
+            math.ceil(original.height * scale),
+        ))
+        # Apply the EXIF orientation before the EXIF data is dropped.
+        image = ImageOps.exif_transpose(original).convert('RGB')
+
+    renditions = {}
+    for size, box in RENDITION_SIZES.items():
+        resized = image.copy()
+        resized.thumbnail(box, Image.LANCZOS)
+        renditions[size] = {}
+        for name, (pil_format, extension) in rendition_formats().items():
+            path = rendition_name(size, extension)
+            renditions[size][name] = default_storage.save(
+                path, ContentFile(_encode(resized, pil_format))
+            )
+    return renditions
+
+
+def rendition_names(renditions):
+    return [
+        path for formats in renditions.values() for path in formats.values()
+    ]
+
+
+def delete_files(names):
+    """Background task: drop references to files of the default storage."""
+    for name in names:
+        default_storage.delete(name)
+
+
+def delete_renditions(renditions):
+    delete_files(rendition_names(renditions))
+
+
+def process_recipe_image(recipe_id, image_name):
+    """Background task: create the renditions of a recipe's image.
+
+    Does nothing if the recipe was deleted or got another image meanwhile.
+    """
+    recipe = Recipe.objects.filter(pk=recipe_id, image=image_name).first()
+    if recipe is None:
+        return
+
+    with recipe.image.open('rb') as image_file:
+        renditions = create_renditions(image_file)
+
+    updated = Recipe.objects.filter(pk=recipe_id, image=image_name).update(
+        image_renditions=renditions, updated_at=timezone.now(),
+    )
+    if updated:
+        bump_generation(recipe.user_id)
+    else:
+        delete_renditions(renditions)
+
+
+def queue_renditions(recipe):
+    enqueue(process_recipe_image, recipe.pk, recipe.image.name)
+
+
+def queue_image_cleanup(recipe):
+    """Delete the current image of `recipe` and its renditions once the
+    change that replaces them, or deletes the recipe, commits.
+
+    Other recipes may share the files; the storage keeps them as long as
+    they are referenced.
+    """
+    names = rendition_names(recipe.image_renditions)
+    if recipe.image:
+        names.append(recipe.image.name)
+    if names:
+        enqueue(delete_files, names)
+
+
+def rendition_urls(renditions, request=None):
+    """Map the storage names of `renditions` to (absolute) URLs."""
+    def url(path):
+        url = default_storage.url(path)
+        return request.build_absolute_uri(url) if request else url
+
+    return {
+        size: {name: url(path) for name, path in formats.items()}
+        for size, formats in renditions.items()
+    }
@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipe.benchmarks import SUITES, BenchmarkError
+
+
+class Command(BaseCommand):
+    help = (
+        'Time parts of the recipe API on a seeded data set. The data is '
+        'rolled back afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'suites', nargs='*',
+            help=(
+                'Suites to run, all by default: '
+                f'{", ".join(sorted(SUITES))}.'
+            ),
+        )
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument(
+            '--tags', type=int, default=50,
+            help='Number of tags and of ingredients.',
+        )
+        parser.add_argument(
+            '--per-recipe', type=int, default=3,
+            help='Tags and ingredients linked to each recipe.',
+        )
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        suites = options['suites'] or sorted(SUITES)
+        unknown = set(suites) - set(SUITES)
+        if unknown:
+            raise CommandError(
+                f'Unknown suites: {", ".join(sorted(unknown))}.'
+            )
+        if options['per_recipe'] > options['tags']:
+            raise CommandError('--per-recipe can not exceed --tags.')
+        for name in suites:
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            try:
+                with transaction.atomic():
+                    for case, label, ms, size, unit in SUITES[name](options):
+                        self.stdout.write(
+                            f'  {case:<28} {label:<10} {ms:10.2f} ms'
+                            f' {size:8} {unit}'
+                        )
+                    transaction.set_rollback(True)
+            except BenchmarkError as exc:
+                raise CommandError(str(exc))
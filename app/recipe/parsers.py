@@ -0,0 +1,112 @@
+import json
+
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.http.multipartparser import (
+    MultiPartParser as DjangoMultiPartParser, MultiPartParserError,
+)
+from rest_framework import status
+from rest_framework.exceptions import APIException, ParseError
+from rest_framework.parsers import BaseParser, DataAndFiles, MultiPartParser
+
+
+# Allowance for the multipart boundaries and headers around the file.
+MULTIPART_OVERHEAD = 16 * 1024
+
+# Longest line of an NDJSON body that is parsed.
+MAX_LINE_BYTES = 1024 * 1024
+
+
+class NDJSONParser(BaseParser):
+    """Lazily parse a newline delimited JSON body.
+
+    `request.data` becomes a generator of `(line_number, value, error)`
+    tuples that reads the body one line at a time, so the upload is never
+    held in memory as a whole. Blank lines are skipped and a line that is
+    not valid JSON, or longer than `MAX_LINE_BYTES`, yields its error
+    instead of a value.
+    """
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', 'utf-8')
+        return self._iter_lines(stream, encoding)
+
+    def _iter_lines(self, stream, encoding):
+        number = 0
+        while True:
+            # Bounded, as a stream buffers a line until its newline.
+            line = stream.readline(MAX_LINE_BYTES + 1)
+            if not line:
+                return
+            number += 1
+            if len(line) > MAX_LINE_BYTES and not line.endswith(b'\n'):
+                while line and not line.endswith(b'\n'):
+                    line = stream.readline(MAX_LINE_BYTES)
+                yield number, None, f'Line longer than {MAX_LINE_BYTES} bytes.'
+                continue
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield number, json.loads(line.decode(encoding)), None
+            except ValueError as exc:
+                yield number, None, f'Invalid JSON: {exc}'
+
+
+class UploadTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = 'The upload is too large.'
+    default_code = 'upload_too_large'
+
+
+class SizeLimitedUploadHandler(TemporaryFileUploadHandler):
+    """Stream uploaded files to a temporary file, up to `max_size` bytes.
+
+    A request that announces a larger body is rejected before any of it is
+    read; one without a Content-Length is rejected as soon as a file grows
+    past the limit. Only one chunk is held in memory at a time.
+    """
+
+    def __init__(self, request=None, max_size=None):
+        super().__init__(request)
+        self.max_size = max_size or settings.IMAGE_UPLOAD_MAX_SIZE
+        self.received = 0
+
+    def handle_raw_input(self, input_data, META, content_length, boundary,
+                         encoding=None):
+        limit = self.max_size + MULTIPART_OVERHEAD
+        if content_length and content_length > limit:
+            raise UploadTooLarge()
+
+    def new_file(self, *args, **kwargs):
+        self.received = 0
+        super().new_file(*args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > self.max_size:
+            self.file.close()
+            raise UploadTooLarge()
+        return super().receive_data_chunk(raw_data, start)
+
+
+class ImageUploadParser(MultiPartParser):
+    """Multipart parser that only accepts size-limited file uploads."""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        request = parser_context['request']
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        meta = request.META.copy()
+        meta['CONTENT_TYPE'] = media_type
+        upload_handlers = [SizeLimitedUploadHandler(request)]
+
+        try:
+            parser = DjangoMultiPartParser(
+                meta, stream, upload_handlers, encoding,
+            )
+            data, files = parser.parse()
+            return DataAndFiles(data, files)
+        except MultiPartParserError as exc:
+            raise ParseError('Multipart form parse error - %s' % str(exc))
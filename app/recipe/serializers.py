@@ -1,74 +1,203 @@
+import warnings
+
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import Case, IntegerField, Value, When
+from django.db.models.functions import Lower
+from PIL import Image
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
 
 from core.models import Recipe , Tag , Ingredient
+from .images import queue_image_cleanup, rendition_urls
+
+
+def name_key(name):
+    """Tag and ingredient names are unique per user by this key."""
+    return name.lower()
+
+
+def _find_by_name(model, user, names):
+    """Map those of `names` that a `model` row of `user` has to the row.
+
+    The database folds the case, as it does for the unique index on the
+    table; Python's folding differs from it for some letters. A row that
+    several of `names` match is mapped from the first of them only.
+    """
+    keys = [Lower(Value(name)) for name in names]
+    rows = model.objects.annotate(name_key=Lower('name')).filter(
+        user=user, name_key__in=keys,
+    ).annotate(matched=Case(
+        *[When(name_key=key, then=Value(i)) for i, key in enumerate(keys)],
+        output_field=IntegerField(),
+    ))
+    return {names[obj.matched]: obj for obj in rows}
+
+
+def get_or_create_by_name(model, user, items):
+    """Return a `model` row for every name in `items`, creating missing ones.
+
+    Names match regardless of case, like the unique index on the table; a
+    new row takes the first spelling given. Existing rows are fetched with
+    one query. Missing ones are inserted with one INSERT that skips the
+    names a concurrent request inserted meanwhile, then read back, so two
+    requests never create the same name twice.
+    """
+    names = {}
+    for item in items:
+        names.setdefault(name_key(item['name']), item['name'])
+    if not names:
+        return []
+    spellings = list(names.values())
 
+    found = _find_by_name(model, user, spellings)
+    missing = [name for name in spellings if name not in found]
+    if missing:
+        # ON CONFLICT DO NOTHING; no ids come back from it in Django 3.2.
+        model.objects.bulk_create(
+            [model(user=user, name=name) for name in missing],
+            ignore_conflicts=True,
+        )
+        # Names the database folds together are read back one per query.
+        more = True
+        while missing and more:
+            more = _find_by_name(model, user, missing)
+            found.update(more)
+            missing = [name for name in missing if name not in more]
 
-class IngredientSerializer(serializers.ModelSerializer):
+    return [found[name] for name in spellings]
+
+
+class UniqueNameMixin:
+    """Refuse renaming a tag or ingredient to a name its user already has."""
+
+    def validate_name(self, value):
+        instance = self.instance
+        if instance is not None:
+            taken = _find_by_name(
+                type(instance), instance.user_id, [value]
+            ).get(value)
+            if taken is not None and taken.pk != instance.pk:
+                raise serializers.ValidationError(
+                    f'There already is a {instance._meta.verbose_name} '
+                    f'named {taken.name}.'
+                )
+        return value
+
+
+class IngredientSerializer(UniqueNameMixin, serializers.ModelSerializer):
     class Meta:
         model = Ingredient
         fields = ['id', 'name']
         read_only_fields = ['id']
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(UniqueNameMixin, serializers.ModelSerializer):
     class Meta:
         model = Tag
         fields = ['id', 'name']
         read_only_fields = ['id']
 
 
+class IngredientCountSerializer(IngredientSerializer):
+    recipe_count = serializers.IntegerField(read_only=True)
+
+    class Meta(IngredientSerializer.Meta):
+        fields = IngredientSerializer.Meta.fields + ['recipe_count']
+
+
+class TagCountSerializer(TagSerializer):
+    recipe_count = serializers.IntegerField(read_only=True)
+
+    class Meta(TagSerializer.Meta):
+        fields = TagSerializer.Meta.fields + ['recipe_count']
+
+
+@extend_schema_field(OpenApiTypes.OBJECT)
+class RenditionsField(serializers.ReadOnlyField):
+    """URLs of the image renditions of a recipe, by size and format."""
+
+    def __init__(self, **kwargs):
+        kwargs['source'] = 'image_renditions'
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        return rendition_urls(value, self.context.get('request'))
+
+
 class RecipeSerializer(serializers.ModelSerializer):
     tags = TagSerializer(many = True , required = False)
     ingredients = IngredientSerializer(many = True , required = False)
+    renditions = RenditionsField()
 
     def _get_or_create_tags(self, tags , recipe):
         auth_user = self.context['request'].user
-        for tag in tags:
-            tag_obj , created = Tag.objects.get_or_create(  # it taking true variable first is for tag and second is for boolean(whether the tag exist() or not
-                user = auth_user,
-                **tag,
-            )
-            recipe.tags.add(tag_obj)
+        recipe.tags.add(*get_or_create_by_name(Tag, auth_user, tags))
 
     def _get_or_create_ingredients(self , ingredients , recipe):
         auth_user = self.context['request'].user
-        for ingredient in ingredients:
-            ingredient_obj , created = Ingredient.objects.get_or_create(
-                user = auth_user,
-                **ingredient,
-            )
-            recipe.ingredients.add(ingredient_obj)
+        recipe.ingredients.add(
+            *get_or_create_by_name(Ingredient, auth_user, ingredients)
+        )
 
 
     class Meta:
         model = Recipe
-        fields = ['id' , 'title' , 'time_minutes' , 'price' , 'link' , 'tags' , 'ingredients',]
+        fields = [
+            'id' , 'title' , 'time_minutes' , 'price' , 'link' , 'tags' ,
+            'ingredients', 'renditions',
+        ]
         read_only_fields = ['id']
 
     def create(self, validated_data):
-        tags = validated_data.pop('tags', [])
-        ingredients = validated_data.pop('ingredients', [])
-        recipe = Recipe.objects.create(**validated_data)
+        with transaction.atomic(using=router.db_for_write(Recipe)):
+            tags = validated_data.pop('tags', [])
+            ingredients = validated_data.pop('ingredients', [])
+            recipe = Recipe.objects.create(**validated_data)
 
-        self._get_or_create_tags(tags, recipe)
-        self._get_or_create_ingredients(ingredients , recipe)
-        return recipe
+            self._get_or_create_tags(tags, recipe)
+            self._get_or_create_ingredients(ingredients , recipe)
+            return recipe
 
     def update(self , instance , validated_data):
-        tags = validated_data.pop('tags' , [])
-        ingredients = validated_data.pop('ingredients', [])
-        if ingredients is not None:
-            instance.ingredients.clear()
-            self._get_or_create_ingredients(ingredients , instance)
+        with transaction.atomic(using=router.db_for_write(Recipe)):
+            # Relations that were not sent are left alone.
+            tags = validated_data.pop('tags' , None)
+            ingredients = validated_data.pop('ingredients', None)
+            if ingredients is not None:
+                self._set_related(
+                    instance.ingredients, Ingredient, ingredients,
+                )
+
+            if tags is not None:
+                self._set_related(instance.tags, Tag, tags)
 
-        if tags is not None:
-            instance.tags.clear()
-            self._get_or_create_tags(tags , instance)
-        for attr , value in validated_data.items():
-            setattr(instance , attr , value)
-        instance.save()
+            changed = [
+                attr for attr , value in validated_data.items()
+                if getattr(instance , attr) != value
+            ]
+            for attr in changed:
+                setattr(instance , attr , validated_data[attr])
+            if changed:
+                instance.save(update_fields=changed + ['updated_at'])
 
-        return instance
+            return instance
+
+    def _set_related(self, manager, model, items):
+        """Link the recipe of `manager` to exactly the named `items`.
+
+        Only the links that differ are deleted and inserted.
+        """
+        auth_user = self.context['request'].user
+        wanted = get_or_create_by_name(model, auth_user, items)
+        current = set(manager.values_list('pk', flat=True))
+        wanted_pks = {obj.pk for obj in wanted}
+        if current - wanted_pks:
+            manager.remove(*(current - wanted_pks))
+        added = [obj for obj in wanted if obj.pk not in current]
+        if added:
+            manager.add(*added)
 
 
 
@@ -80,11 +209,57 @@ class RecipeDetailSerializer(RecipeSerializer):
 
 
 
+class ImageHeaderField(serializers.ImageField):
+    """An image field that checks the image header before anything else.
+
+    `Image.open` only reads the header, so the format and dimensions are
+    known before any pixel is decoded. Images of more than
+    `IMAGE_UPLOAD_MAX_PIXELS` pixels, e.g. decompression bombs, are
+    rejected right there.
+    """
+    default_error_messages = {
+        'format': 'Unsupported image format {format}.',
+        'pixels': 'The image can have at most {max_pixels} pixels.',
+    }
+    FORMATS = ('JPEG', 'PNG', 'WEBP', 'GIF')
+
+    def to_internal_value(self, data):
+        if hasattr(data, 'seek'):
+            self._check_header(data)
+        return super().to_internal_value(data)
+
+    def _check_header(self, data):
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter('error', Image.DecompressionBombWarning)
+                with Image.open(data) as image:
+                    image_format, (width, height) = image.format, image.size
+        except (Image.DecompressionBombWarning, Image.DecompressionBombError):
+            self.fail('pixels', max_pixels=settings.IMAGE_UPLOAD_MAX_PIXELS)
+        except Exception:
+            self.fail('invalid_image')
+        finally:
+            data.seek(0)
+
+        if image_format not in self.FORMATS:
+            self.fail('format', format=image_format)
+        if width * height > settings.IMAGE_UPLOAD_MAX_PIXELS:
+            self.fail('pixels', max_pixels=settings.IMAGE_UPLOAD_MAX_PIXELS)
+
+
 class RecipeImageSerializer(serializers.ModelSerializer):
     """Serializer for uploading images to recipes."""
+    image = ImageHeaderField(required=True)
+    renditions = RenditionsField()
 
     class Meta:
         model = Recipe
-        fields = ['id', 'image']
+        fields = ['id', 'image', 'renditions']
         read_only_fields = ['id']
-        extra_kwargs = {'image': {'required': 'True'}}
\ No newline at end of file
+        extra_kwargs = {'image': {'required': 'True'}}
+
+    def update(self, instance, validated_data):
+        # The former image and its renditions are deleted in the background.
+        queue_image_cleanup(instance)
+        validated_data['image_renditions'] = {}
+        return super().update(instance, validated_data)
\ No newline at end of file
@@ -0,0 +1,44 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+
+from core.models import Recipe, Tag, Ingredient
+from core.shards import using_shard
+from . import cache
+from .images import queue_image_cleanup
+
+
+def _invalidate(user_id, using):
+    # Bump right away so later reads in this process miss, and again on
+    # commit so entries cached from reads made before the commit are
+    # discarded too.
+    cache.bump_generation(user_id)
+    transaction.on_commit(partial(cache.bump_generation, user_id), using=using)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_list_cache(sender, instance, using=None, **kwargs):
+    _invalidate(instance.user_id, using)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def invalidate_list_cache_on_link(sender, instance, action, using=None,
+                                  **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        _invalidate(instance.user_id, using)
+
+
+@receiver(post_delete, sender=Recipe)
+def release_image_files(sender, instance, using=None, **kwargs):
+    # Also for recipes deleted by a cascade. The files are let go of once
+    # the database the recipe was deleted from commits.
+    with using_shard(using):
+        queue_image_cleanup(instance)
@@ -0,0 +1,305 @@
+import csv
+import io
+import json
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+from recipe import bulk
+
+
+IMPORT_URL = reverse('recipe:recipe-bulk-import')
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+def create_user(email='bulk@example.com', password='12345'):
+    return get_user_model().objects.create_user(email, password)
+
+
+def ndjson(*rows):
+    return '\n'.join(
+        row if isinstance(row, str) else json.dumps(row) for row in rows
+    )
+
+
+class PublicBulkApiTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_auth_required(self):
+        res = self.client.post(
+            IMPORT_URL, ndjson({}), content_type='application/x-ndjson'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_export_auth_required(self):
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertIn('detail', json.loads(res.content))
+
+
+class RecipeImportTests(TestCase):
+    def setUp(self):
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def post(self, *rows):
+        return self.client.post(
+            IMPORT_URL, ndjson(*rows), content_type='application/x-ndjson'
+        )
+
+    def test_import_recipes(self):
+        """Test recipes with nested tags and ingredients are imported."""
+        Tag.objects.create(user=self.user, name='Dinner')
+        res = self.post(
+            {
+                'title': 'Curry',
+                'time_minutes': 30,
+                'price': '7.50',
+                'description': 'Spicy',
+                'tags': [{'name': 'Dinner'}, {'name': 'Indian'}],
+                'ingredients': [{'name': 'Rice'}, {'name': 'Rice'}],
+            },
+            '',
+            {'title': 'Toast', 'time_minutes': 2, 'price': '1.00'},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['created'], 2)
+        self.assertEqual(res.data['failed'], 0)
+        curry = Recipe.objects.get(user=self.user, title='Curry')
+        self.assertEqual(curry.description, 'Spicy')
+        self.assertEqual(curry.price, Decimal('7.50'))
+        self.assertEqual(
+            sorted(curry.tags.values_list('name', flat=True)),
+            ['Dinner', 'Indian'],
+        )
+        self.assertEqual(
+            list(curry.ingredients.values_list('name', flat=True)), ['Rice']
+        )
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+        toast = Recipe.objects.get(user=self.user, title='Toast')
+        self.assertFalse(toast.tags.exists())
+
+    def test_import_non_ascii_names(self):
+        """Test names the database lowers differently from Python import."""
+        Tag.objects.create(user=self.user, name='École')
+        res = self.post(
+            {
+                'title': 'Crêpes', 'time_minutes': 20, 'price': '3.00',
+                'tags': [{'name': 'École'}, {'name': 'ΟΔΟΣ'}],
+                'ingredients': [{'name': 'Œufs'}],
+            },
+            {
+                'title': 'Galette', 'time_minutes': 20, 'price': '3.00',
+                'tags': [{'name': 'ΟΔΟΣ'}],
+            },
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['created'], 2)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+        crepes = Recipe.objects.get(user=self.user, title='Crêpes')
+        self.assertEqual(
+            sorted(crepes.tags.values_list('name', flat=True)),
+            ['École', 'ΟΔΟΣ'],
+        )
+
+    def test_import_reports_invalid_rows(self):
+        """Test invalid rows are reported without aborting the import."""
+        res = self.post(
+            {'title': 'Good', 'time_minutes': 5, 'price': '2.00'},
+            '{not json',
+            {'title': 'No price', 'time_minutes': 5},
+            {'title': 'Also good', 'time_minutes': 5, 'price': '3.00'},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['created'], 2)
+        self.assertEqual(res.data['failed'], 2)
+        self.assertEqual([e['line'] for e in res.data['errors']], [2, 3])
+        self.assertIn('price', res.data['errors'][1]['errors'])
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 2)
+
+    @patch('recipe.parsers.MAX_LINE_BYTES', 64)
+    def test_import_reports_long_lines(self):
+        """Test a line over the limit is reported and the next parsed."""
+        res = self.post(
+            {'title': 'x' * 100, 'time_minutes': 5, 'price': '2.00'},
+            {'title': 'Short', 'time_minutes': 5, 'price': '3.00'},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['created'], 1)
+        self.assertEqual([e['line'] for e in res.data['errors']], [1])
+        self.assertTrue(
+            Recipe.objects.filter(user=self.user, title='Short').exists()
+        )
+
+    def test_import_names_folded_together(self):
+        """Test names of one row that the database folds together import."""
+        res = self.post({
+            'title': 'Souvlaki', 'time_minutes': 20, 'price': '6.00',
+            'tags': [{'name': 'ΟΔΟΣ'}, {'name': 'οδοσ'}],
+        })
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['created'], 1)
+        recipe = Recipe.objects.get(user=self.user, title='Souvlaki')
+        self.assertEqual(
+            recipe.tags.count(), Tag.objects.filter(user=self.user).count()
+        )
+
+    def test_import_in_chunks(self):
+        """Test every chunk of a multi chunk import is written."""
+        importer = bulk.RecipeImporter(self.user, chunk_size=2)
+        rows = [
+            (i, {
+                'title': f'Recipe {i}',
+                'time_minutes': 5,
+                'price': '1.00',
+                'ingredients': [{'name': 'Salt'}],
+            }, None)
+            for i in range(1, 6)
+        ]
+
+        summary = importer.run(iter(rows))
+
+        self.assertEqual(summary['created'], 5)
+        self.assertEqual(Ingredient.objects.filter(user=self.user).count(), 1)
+        salt = Ingredient.objects.get(user=self.user)
+        self.assertEqual(salt.recipe_set.count(), 5)
+
+    def test_imported_recipes_belong_to_user(self):
+        """Test imported recipes are owned by the requesting user."""
+        other = create_user(email='other@example.com')
+
+        self.post({
+            'title': 'Soup',
+            'time_minutes': 5,
+            'price': '2.00',
+            'user': other.id,
+        })
+
+        recipe = Recipe.objects.get(title='Soup')
+        self.assertEqual(recipe.user, self.user)
+
+
+class RecipeExportTests(TestCase):
+    def setUp(self):
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_recipe(self, title, tags=(), ingredients=()):
+        recipe = Recipe.objects.create(
+            user=self.user,
+            title=title,
+            time_minutes=10,
+            price=Decimal('5.50'),
+            description=f'{title} description',
+        )
+        for name in tags:
+            recipe.tags.add(
+                Tag.objects.get_or_create(user=self.user, name=name)[0]
+            )
+        for name in ingredients:
+            recipe.ingredients.add(
+                Ingredient.objects.get_or_create(user=self.user, name=name)[0]
+            )
+        return recipe
+
+    def test_export_ndjson(self):
+        """Test recipes are streamed one JSON document per line."""
+        r1 = self.create_recipe('Curry', tags=['Dinner'], ingredients=['Rice'])
+        r2 = self.create_recipe('Toast')
+        other = create_user(email='other@example.com')
+        Recipe.objects.create(
+            user=other, title='Hidden', time_minutes=1, price=Decimal('1.00')
+        )
+
+        res = self.client.get(EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        self.assertTrue(res['Content-Type'].startswith('application/x-ndjson'))
+        rows = [
+            json.loads(line)
+            for line in b''.join(res.streaming_content).decode().splitlines()
+        ]
+        self.assertEqual([row['id'] for row in rows], [r1.id, r2.id])
+        self.assertEqual(rows[0]['price'], '5.50')
+        self.assertEqual(rows[0]['description'], 'Curry description')
+        self.assertEqual(
+            rows[0]['tags'], [{'id': r1.tags.get().id, 'name': 'Dinner'}]
+        )
+        self.assertEqual(rows[1]['ingredients'], [])
+
+    def test_export_csv(self):
+        """Test recipes are exported as CSV with joined relation names."""
+        self.create_recipe('Curry', tags=['Dinner', 'Indian'])
+
+        res = self.client.get(EXPORT_URL, {'format': 'csv'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res['Content-Type'].startswith('text/csv'))
+        content = b''.join(res.streaming_content).decode()
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['title'], 'Curry')
+        self.assertEqual(rows[0]['tags'], 'Dinner|Indian')
+
+    def test_export_csv_escapes_formulas(self):
+        """Test text a spreadsheet would run as a formula is escaped."""
+        self.create_recipe('=1+1', tags=['@SUM'])
+        self.create_recipe('\t+1', tags=['-1', 'Dinner'])
+
+        res = self.client.get(EXPORT_URL, {'format': 'csv'})
+
+        content = b''.join(res.streaming_content).decode()
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual(
+            [(row['title'], row['tags']) for row in rows],
+            [
+                ("'=1+1", "'@SUM"),
+                ("'\t+1", "'-1|Dinner"),
+            ],
+        )
+        self.assertEqual(rows[0]['price'], '5.50')
+
+    def test_export_filtered_by_tags(self):
+        """Test the export honours the list filters."""
+        r1 = self.create_recipe('Curry', tags=['Dinner'])
+        self.create_recipe('Toast', tags=['Breakfast'])
+        tag = Tag.objects.get(name='Dinner')
+
+        res = self.client.get(EXPORT_URL, {'tags': str(tag.id)})
+
+        lines = b''.join(res.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line)['id'] for line in lines], [r1.id])
+
+    def test_export_queries_per_chunk(self):
+        """Test relations are fetched once per chunk, not per recipe."""
+        for i in range(5):
+            self.create_recipe(
+                f'Recipe {i}', tags=['Dinner'], ingredients=['Salt'],
+            )
+        queryset = Recipe.objects.filter(user=self.user)
+
+        with CaptureQueriesContext(connection) as ctx:
+            rows = list(bulk.iter_export_rows(queryset, chunk_size=2))
+
+        self.assertEqual(len(rows), 5)
+        # One recipe query plus two relation queries for each of 3 chunks.
+        self.assertEqual(len(ctx.captured_queries), 7)
@@ -0,0 +1,68 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from core.models import Recipe, Tag
+
+
+class BenchmarkCommandTests(TestCase):
+    def test_benchmark_filters(self):
+        """Test the filters suite reports every case and rolls back."""
+        out = StringIO()
+
+        call_command(
+            'benchmark', 'filters',
+            recipes=40, tags=5, repeat=1, stdout=out,
+        )
+
+        output = out.getvalue()
+        self.assertIn('tags match=all page', output)
+        self.assertIn('ingredients match=any all', output)
+        self.assertIn('exists', output)
+        self.assertFalse(Recipe.objects.exists())
+        self.assertFalse(Tag.objects.exists())
+
+    def test_benchmark_rendering(self):
+        """Test the rendering suite reports timings and sizes."""
+        out = StringIO()
+
+        call_command(
+            'benchmark', 'rendering',
+            recipes=10, tags=5, repeat=1, stdout=out,
+        )
+
+        output = out.getvalue()
+        self.assertIn('10 details render', output)
+        self.assertIn('gzip', output)
+        self.assertIn('bytes', output)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_benchmark_listing(self):
+        """Test the listing suite compares both read paths."""
+        out = StringIO()
+
+        call_command(
+            'benchmark', 'listing',
+            recipes=10, tags=5, repeat=1, stdout=out,
+        )
+
+        output = out.getvalue()
+        self.assertIn('serializer', output)
+        self.assertIn('values', output)
+
+    def test_benchmark_connections(self):
+        """Test the connections suite times new and reused connections."""
+        out = StringIO()
+
+        call_command('benchmark', 'connections', repeat=2, stdout=out)
+
+        output = out.getvalue()
+        for label in ('new', 'reused', 'checked'):
+            self.assertIn(label, output)
+
+    def test_benchmark_unknown_suite(self):
+        """Test an unknown suite name is rejected."""
+        with self.assertRaises(CommandError):
+            call_command('benchmark', 'nonsense', stdout=StringIO())
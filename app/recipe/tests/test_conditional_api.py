@@ -0,0 +1,169 @@
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+
+
+RECIPE_URL = reverse('recipe:recipe-list')
+TAG_URL = reverse('recipe:tag-list')
+
+
+def detail_url(recipe_id):
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def create_user(email='etag@example.com', password='12345'):
+    return get_user_model().objects.create_user(email, password)
+
+
+def create_recipe(user, **params):
+    defaults = {'title': 'Soup', 'time_minutes': 5, 'price': Decimal('2.00')}
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assertNotModified(self, url, etag, params=None):
+        with self.assertNumQueries(1):
+            res = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res.content, b'')
+        self.assertEqual(res['ETag'], etag)
+
+    def test_detail_not_modified(self):
+        """Test an unchanged recipe is answered with a 304."""
+        recipe = create_recipe(self.user)
+        url = detail_url(recipe.id)
+
+        res = self.client.get(url)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn('Last-Modified', res)
+        self.assertNotModified(url, res['ETag'])
+
+    def test_if_modified_since_ignored(self):
+        """Test If-Modified-Since does not hide changes within a second."""
+        recipe = create_recipe(self.user)
+        url = detail_url(recipe.id)
+
+        res = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 60),
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_detail_changes_after_update(self):
+        """Test updating a recipe changes its ETag."""
+        recipe = create_recipe(self.user)
+        url = detail_url(recipe.id)
+        etag = self.client.get(url)['ETag']
+
+        self.client.patch(url, {'title': 'Stew'})
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['title'], 'Stew')
+        self.assertNotEqual(res['ETag'], etag)
+
+    def test_detail_changes_with_tags(self):
+        """Test linking, renaming and deleting a tag change the ETag."""
+        recipe = create_recipe(self.user)
+        tag = Tag.objects.create(user=self.user, name='Dinner')
+        url = detail_url(recipe.id)
+        etags = [self.client.get(url)['ETag']]
+
+        recipe.tags.add(tag)
+        etags.append(self.client.get(url)['ETag'])
+        tag.name = 'Supper'
+        tag.save()
+        etags.append(self.client.get(url)['ETag'])
+        tag.delete()
+        etags.append(self.client.get(url)['ETag'])
+
+        self.assertEqual(len(set(etags)), 4)
+
+    def test_other_users_recipe_not_found(self):
+        """Test conditional handling keeps the queryset user scoping."""
+        recipe = create_recipe(create_user(email='other@example.com'))
+
+        res = self.client.get(detail_url(recipe.id), HTTP_IF_NONE_MATCH='*')
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_malformed_id_not_found(self):
+        """Test a detail URL with a non numeric id is a 404."""
+        res = self.client.get(detail_url('abc'))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_list_not_modified(self):
+        """Test an unchanged list is answered with a 304."""
+        create_recipe(self.user)
+        etag = self.client.get(RECIPE_URL)['ETag']
+
+        self.assertNotModified(RECIPE_URL, etag)
+
+    def test_list_changes_after_delete(self):
+        """Test deleting a recipe changes the list ETag."""
+        create_recipe(self.user)
+        recipe = create_recipe(self.user)
+        etag = self.client.get(RECIPE_URL)['ETag']
+
+        recipe.delete()
+        res = self.client.get(RECIPE_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_list_etag_depends_on_params(self):
+        """Test different query strings get different ETags."""
+        create_recipe(self.user)
+
+        etag = self.client.get(RECIPE_URL)['ETag']
+        res = self.client.get(
+            RECIPE_URL, {'page_size': 1}, HTTP_IF_NONE_MATCH=etag
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_assigned_only_changes_when_assignment_moves(self):
+        """Test moving a recipe from one tag to another changes the ETag."""
+        tag1 = Tag.objects.create(user=self.user, name='Breakfast')
+        tag2 = Tag.objects.create(user=self.user, name='Lunch')
+        recipe = create_recipe(self.user)
+        recipe.tags.add(tag1)
+        params = {'assigned_only': 1}
+        etag = self.client.get(TAG_URL, params)['ETag']
+
+        recipe.tags.clear()
+        recipe.tags.add(tag2)
+        res = self.client.get(TAG_URL, params, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'][0]['name'], 'Lunch')
+
+    def test_counts_change_when_recipe_deleted(self):
+        """Test deleting a recipe changes the ETag of its tags' counts."""
+        tag = Tag.objects.create(user=self.user, name='Breakfast')
+        recipe = create_recipe(self.user)
+        recipe.tags.add(tag)
+        params = {'with_counts': 1}
+        etag = self.client.get(TAG_URL, params)['ETag']
+
+        recipe.delete()
+        res = self.client.get(TAG_URL, params, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'][0]['recipe_count'], 0)
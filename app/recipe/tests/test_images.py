@@ -0,0 +1,312 @@
+import os
+import shutil
+import tempfile
+from decimal import Decimal
+from io import BytesIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image, ImageFile
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, StoredFile
+from recipe import images
+from recipe.parsers import SizeLimitedUploadHandler, UploadTooLarge
+
+
+def image_upload_url(recipe_id):
+    return reverse('recipe:recipe-upload-image', args=[recipe_id])
+
+
+def detail_url(recipe_id):
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def jpeg_upload(size=(2000, 1000), exif=None, color='red'):
+    buffer = BytesIO()
+    Image.new('RGB', size, color).save(
+        buffer, 'JPEG', **({'exif': exif} if exif else {})
+    )
+    buffer.seek(0)
+    buffer.name = 'photo.jpg'
+    return buffer
+
+
+@override_settings(TASKS_EAGER=True)
+class ImageApiTestCase(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(shutil.rmtree, self.media_root)
+
+        self.user = get_user_model().objects.create_user(
+            'images@example.com', '12345'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=5,
+            price=Decimal('2.00'),
+        )
+
+    def post_image(self, image):
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.post(
+                image_upload_url(self.recipe.id), {'image': image},
+                format='multipart',
+            )
+        self.recipe.refresh_from_db()
+        return res
+
+    def upload(self, image):
+        res = self.post_image(image)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res
+
+
+class RecipeImageRenditionTests(ImageApiTestCase):
+    def open_rendition(self, size, name='jpeg'):
+        path = self.recipe.image_renditions[size][name]
+        return Image.open(default_storage.open(path))
+
+    def test_upload_answers_before_processing(self):
+        """Test the upload response does not wait for the renditions."""
+        res = self.upload(jpeg_upload())
+
+        self.assertEqual(res.data['renditions'], {})
+
+    def test_renditions_created(self):
+        """Test every size is written in every format, within its box."""
+        self.upload(jpeg_upload())
+
+        for size, box in images.RENDITION_SIZES.items():
+            self.assertEqual(
+                set(self.recipe.image_renditions[size]),
+                set(images.rendition_formats()),
+            )
+            with self.open_rendition(size) as rendition:
+                self.assertEqual(rendition.width, box[0])
+                self.assertLessEqual(rendition.height, box[1])
+
+    def test_rendition_urls_in_detail(self):
+        """Test the recipe detail links to the renditions."""
+        self.upload(jpeg_upload())
+
+        res = self.client.get(detail_url(self.recipe.id))
+
+        url = res.data['renditions']['thumbnail']['jpeg']
+        self.assertTrue(url.startswith('http://testserver/'))
+        self.assertTrue(url.endswith('.jpg'))
+
+    def test_exif_stripped(self):
+        """Test no EXIF data of the upload ends up in a rendition."""
+        exif = Image.Exif()
+        exif[0x010F] = 'Camera maker'
+        self.upload(jpeg_upload(exif=exif.tobytes()))
+
+        with self.open_rendition('medium') as rendition:
+            self.assertEqual(len(rendition.getexif()), 0)
+
+    def test_exif_orientation_applied(self):
+        """Test a rotated photo is rotated upright before EXIF is dropped."""
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        self.upload(jpeg_upload(size=(400, 200), exif=exif.tobytes()))
+
+        with self.open_rendition('thumbnail') as rendition:
+            self.assertEqual(rendition.size, (100, 200))
+
+    def test_jpeg_decoded_at_reduced_scale(self):
+        """Test a large JPEG is decoded no larger than the renditions need."""
+        transpose = images.ImageOps.exif_transpose
+        decoded = []
+
+        def record_size(image):
+            decoded.append(image.size)
+            return transpose(image)
+
+        with patch('recipe.images.ImageOps.exif_transpose', record_size):
+            self.upload(jpeg_upload(size=(4000, 2000)))
+
+        self.assertEqual(decoded, [(2000, 1000)])
+        with self.open_rendition('large') as rendition:
+            self.assertEqual(rendition.size, (1600, 800))
+
+    def test_reupload_replaces_renditions(self):
+        """Test the renditions of a replaced image are deleted."""
+        self.upload(jpeg_upload())
+        old = self.recipe.image_renditions['thumbnail']['jpeg']
+
+        self.upload(jpeg_upload(color='blue'))
+
+        self.assertFalse(default_storage.exists(old))
+        self.assertNotEqual(
+            self.recipe.image_renditions['thumbnail']['jpeg'], old
+        )
+
+    def test_stale_task_skipped(self):
+        """Test a task for an image that was replaced does nothing."""
+        self.upload(jpeg_upload())
+
+        images.process_recipe_image(self.recipe.id, 'uploads/recipe/old.jpg')
+
+        self.recipe.refresh_from_db()
+        self.assertTrue(self.recipe.image_renditions)
+        self.assertTrue(os.path.exists(self.recipe.image.path))
+
+
+class ImageUploadLimitTests(ImageApiTestCase):
+    @override_settings(IMAGE_UPLOAD_MAX_SIZE=1024)
+    def test_oversized_upload_rejected(self):
+        """Test an upload over the size limit is refused with a 413."""
+        res = self.post_image(jpeg_upload(size=(1000, 1000)))
+
+        self.assertEqual(
+            res.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        )
+        self.assertFalse(self.recipe.image)
+        self.assertEqual(os.listdir(self.media_root), [])
+
+    def test_oversized_stream_rejected(self):
+        """Test a body without a length is cut off at the size limit."""
+        handler = SizeLimitedUploadHandler(max_size=10)
+        handler.handle_raw_input(None, {}, None, 'boundary')
+        handler.new_file('image', 'photo.jpg', 'image/jpeg', None)
+        handler.receive_data_chunk(b'x' * 10, 0)
+
+        with self.assertRaises(UploadTooLarge):
+            handler.receive_data_chunk(b'x', 10)
+
+    @override_settings(IMAGE_UPLOAD_MAX_PIXELS=100)
+    def test_too_many_pixels_rejected(self):
+        """Test an image over the pixel limit is refused."""
+        res = self.post_image(jpeg_upload(size=(20, 20)))
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('image', res.data)
+        self.assertFalse(self.recipe.image)
+
+    def test_pixels_read_from_header_only(self):
+        """Test the pixel check does not decode the image."""
+        upload = jpeg_upload(size=(20, 20))
+
+        with patch.object(ImageFile.ImageFile, 'load') as patched_load:
+            with override_settings(IMAGE_UPLOAD_MAX_PIXELS=100):
+                res = self.post_image(upload)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        patched_load.assert_not_called()
+
+    def test_unsupported_format_rejected(self):
+        """Test an image format other than the web formats is refused."""
+        buffer = BytesIO()
+        Image.new('RGB', (10, 10)).save(buffer, 'TIFF')
+        buffer.seek(0)
+        buffer.name = 'photo.tiff'
+
+        res = self.post_image(buffer)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ImageUploadTests(ImageApiTestCase):
+    def test_reupload_deletes_old_image(self):
+        """Test replacing an image deletes the former file."""
+        self.upload(jpeg_upload())
+        old = self.recipe.image.path
+
+        self.upload(jpeg_upload(color='blue'))
+
+        self.assertFalse(os.path.exists(old))
+        self.assertTrue(os.path.exists(self.recipe.image.path))
+
+    def test_identical_uploads_share_files(self):
+        """Test recipes with the same image share its files until the last
+        one lets go of them.
+        """
+        other = Recipe.objects.create(
+            user=self.user, title='Stew', time_minutes=5,
+            price=Decimal('2.00'),
+        )
+        self.upload(jpeg_upload())
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                image_upload_url(other.id), {'image': jpeg_upload()},
+                format='multipart',
+            )
+        other.refresh_from_db()
+        self.assertEqual(other.image.name, self.recipe.image.name)
+        self.assertEqual(other.image_renditions, self.recipe.image_renditions)
+
+        self.upload(jpeg_upload(color='blue'))
+
+        self.assertTrue(os.path.exists(other.image.path))
+        for path in images.rendition_names(other.image_renditions):
+            self.assertTrue(default_storage.exists(path))
+
+    def test_delete_recipe_releases_files(self):
+        """Test deleting a recipe lets go of its image and renditions."""
+        self.upload(jpeg_upload())
+        names = [self.recipe.image.name] + images.rendition_names(
+            self.recipe.image_renditions
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.delete(detail_url(self.recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(StoredFile.objects.filter(name__in=names).exists())
+        for name in names:
+            self.assertFalse(default_storage.exists(name))
+
+    def test_deleted_user_releases_files(self):
+        """Test the images of recipes deleted by a cascade are let go of."""
+        self.upload(jpeg_upload())
+        name = self.recipe.image.name
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.delete()
+
+        self.assertEqual(default_storage.references(name), 0)
+        self.assertFalse(default_storage.exists(name))
+
+    def test_upload_to_other_users_recipe(self):
+        """Test the image of another user's recipe can not be replaced."""
+        other = get_user_model().objects.create_user(
+            'other@example.com', '12345'
+        )
+        recipe = Recipe.objects.create(
+            user=other, title='Stew', time_minutes=5, price=Decimal('2.00'),
+        )
+
+        res = self.client.post(
+            image_upload_url(recipe.id), {'image': jpeg_upload()},
+            format='multipart',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        recipe.refresh_from_db()
+        self.assertFalse(recipe.image)
+
+    def test_upload_reads_locked_image_columns(self):
+        """Test the recipe is fetched scoped, locked and without its text."""
+        with CaptureQueriesContext(connection) as ctx:
+            self.upload(jpeg_upload())
+
+        select = next(
+            q['sql'] for q in ctx.captured_queries
+            if q['sql'].startswith('SELECT')
+            and 'FROM "core_recipe"' in q['sql']
+        )
+        self.assertIn('"core_recipe"."user_id" = ', select)
+        self.assertNotIn('"description"', select)
+        if connection.features.has_select_for_update:
+            self.assertIn('FOR UPDATE', select)
@@ -40,7 +40,7 @@ class PrivateIngredientApiTest(TestCase):
         self.assertEqual(res.status_code , status.HTTP_200_OK)
         ingredients = Ingredient.objects.all().order_by('-name')
         serializer = IngredientSerializer(ingredients , many = True)
-        self.assertEqual(res.data , serializer.data)
+        self.assertEqual(res.data['results'] , serializer.data)
 
     def test_ingredient_limited_to_user(self):
         ingredient=Ingredient.objects.create(user =self.user , name= 'ingredient1')
@@ -49,9 +49,9 @@ class PrivateIngredientApiTest(TestCase):
         res= self.client.get(INGREDIENT_URL)
 
         self.assertEqual(res.status_code , status.HTTP_200_OK)
-        self.assertEqual(len(res.data) , 1)
-        self.assertEqual(res.data[0]['name'] , ingredient.name)
-        self.assertEqual(res.data[0]['id'] , ingredient.id)
+        self.assertEqual(len(res.data['results']) , 1)
+        self.assertEqual(res.data['results'][0]['name'] , ingredient.name)
+        self.assertEqual(res.data['results'][0]['id'] , ingredient.id)
 
     def test_update_ingredient(self):
         ingredient=Ingredient.objects.create(user =self.user , name= 'ingredient1')
@@ -88,8 +88,8 @@ class PrivateIngredientApiTest(TestCase):
 
         s1 = IngredientSerializer(in1)
         s2 = IngredientSerializer(in2)
-        self.assertIn(s1.data, res.data)
-        self.assertNotIn(s2.data, res.data)
+        self.assertIn(s1.data, res.data['results'])
+        self.assertNotIn(s2.data, res.data['results'])
 
     def test_filtered_ingredients_unique(self):
         """Test filtered ingredients returns a unique list."""
@@ -112,4 +112,25 @@ class PrivateIngredientApiTest(TestCase):
 
         res = self.client.get(INGREDIENT_URL, {'assigned_only': 1})
 
-        self.assertEqual(len(res.data), 1)
\ No newline at end of file
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_ingredients_assigned_only_with_counts(self):
+        """Test assigned_only and with_counts combine."""
+        ing = Ingredient.objects.create(user=self.user, name='Eggs')
+        Ingredient.objects.create(user=self.user, name='Lentils')
+        recipe = Recipe.objects.create(
+            title='Omelette',
+            time_minutes=5,
+            price=Decimal('3.00'),
+            user=self.user,
+        )
+        recipe.ingredients.add(ing)
+
+        res = self.client.get(
+            INGREDIENT_URL, {'assigned_only': 1, 'with_counts': 1}
+        )
+
+        self.assertEqual(
+            res.data['results'],
+            [{'id': ing.id, 'name': 'Eggs', 'recipe_count': 1}],
+        )
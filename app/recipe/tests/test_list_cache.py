@@ -0,0 +1,144 @@
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+from recipe.cache import normalize_params
+
+
+RECIPE_URL = reverse('recipe:recipe-list')
+TAG_URL = reverse('recipe:tag-list')
+INGREDIENT_URL = reverse('recipe:ingredient-list')
+
+
+def create_user(email='cache@example.com', password='12345'):
+    return get_user_model().objects.create_user(email, password)
+
+
+def create_recipe(user, **params):
+    defaults = {'title': 'Soup', 'time_minutes': 5, 'price': Decimal('2.00')}
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+@override_settings(API_CACHE_TIMEOUT=300)
+class ListCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_repeated_list_served_from_cache(self):
+        """Test an unchanged list only costs its version query."""
+        create_recipe(self.user)
+        Tag.objects.create(user=self.user, name='Dinner')
+        Ingredient.objects.create(user=self.user, name='Salt')
+
+        for url in (RECIPE_URL, TAG_URL, INGREDIENT_URL):
+            first = self.client.get(url)
+            with self.assertNumQueries(1):
+                second = self.client.get(url)
+            self.assertEqual(second.status_code, status.HTTP_200_OK)
+            self.assertEqual(first.data, second.data)
+
+    def test_write_through_api_invalidates(self):
+        """Test creating a recipe through the API refreshes the list."""
+        self.client.get(RECIPE_URL)
+        payload = {'title': 'Curry', 'time_minutes': 30, 'price': '5.00'}
+        self.client.post(RECIPE_URL, payload)
+
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_tag_rename_invalidates_recipe_list(self):
+        """Test renaming a tag refreshes the nested recipe data."""
+        tag = Tag.objects.create(user=self.user, name='Dinner')
+        create_recipe(self.user).tags.add(tag)
+        self.client.get(RECIPE_URL)
+
+        tag.name = 'Supper'
+        tag.save()
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res.data['results'][0]['tags'][0]['name'], 'Supper')
+
+    def test_link_change_invalidates(self):
+        """Test assigning a tag refreshes the assigned_only list."""
+        tag = Tag.objects.create(user=self.user, name='Dinner')
+        recipe = create_recipe(self.user)
+        res = self.client.get(TAG_URL, {'assigned_only': 1})
+        self.assertEqual(res.data['results'], [])
+
+        recipe.tags.add(tag)
+        res = self.client.get(TAG_URL, {'assigned_only': 1})
+
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_cache_keyed_by_params(self):
+        """Test filtered and unfiltered lists are cached separately."""
+        tag = Tag.objects.create(user=self.user, name='Dinner')
+        create_recipe(self.user).tags.add(tag)
+        create_recipe(self.user)
+
+        self.assertEqual(len(self.client.get(RECIPE_URL).data['results']), 2)
+        res = self.client.get(RECIPE_URL, {'tags': str(tag.id)})
+
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_cache_is_per_user(self):
+        """Test one user's cached list is never served to another."""
+        create_recipe(self.user)
+        self.client.get(RECIPE_URL)
+        other = create_user(email='other@example.com')
+        self.client.force_authenticate(other)
+
+        res = self.client.get(RECIPE_URL)
+
+        self.assertEqual(res.data['results'], [])
+
+    def test_other_user_writes_keep_cache(self):
+        """Test another user's writes do not invalidate this user's lists."""
+        create_recipe(self.user)
+        self.client.get(RECIPE_URL)
+        create_recipe(create_user(email='other@example.com'))
+
+        with self.assertNumQueries(1):
+            self.client.get(RECIPE_URL)
+
+    @override_settings(ALLOWED_HOSTS=['testserver', 'api.example.com'])
+    def test_cache_is_per_host(self):
+        """Test lists with absolute URLs are cached per host."""
+        for i in range(3):
+            create_recipe(self.user, title=f'Soup {i}')
+        self.client.get(RECIPE_URL, {'page_size': 1})
+
+        res = self.client.get(
+            RECIPE_URL, {'page_size': 1}, HTTP_HOST='api.example.com',
+        )
+
+        self.assertTrue(
+            res.data['next'].startswith('http://api.example.com/')
+        )
+
+    @override_settings(API_CACHE_TIMEOUT=0)
+    def test_not_cached_without_timeout(self):
+        with patch('recipe.cache.cache') as patched_cache:
+            res = self.client.get(TAG_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        patched_cache.set.assert_not_called()
+
+    def test_normalize_params(self):
+        """Test equivalent query strings share a cache key."""
+        self.assertEqual(
+            normalize_params({'tags': '3,1,3', 'ingredients': '', 'x': '1'}),
+            normalize_params({'tags': '1,3'}),
+        )
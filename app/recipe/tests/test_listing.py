@@ -0,0 +1,113 @@
+"""
+Parity of the `.values()` read path of the list endpoints with the list
+serializers: both must render to the same JSON bytes.
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db.models import Prefetch
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory
+
+from core.models import Recipe, Tag, Ingredient
+from recipe import listing, serializers
+from recipe.filters import annotate_recipe_count
+
+
+RECIPE_URL = reverse('recipe:recipe-list')
+TAG_URL = reverse('recipe:tag-list')
+INGREDIENT_URL = reverse('recipe:ingredient-list')
+
+
+class ListingParityTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'listing@example.com', '12345'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        vegan = Tag.objects.create(user=self.user, name='Vegan')
+        quick = Tag.objects.create(user=self.user, name='Quick — “fast”')
+        salt = Ingredient.objects.create(user=self.user, name='Salt')
+        self.soup = Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=5,
+            price=Decimal('2.5'), link='https://example.com/soup',
+            image_renditions={
+                'thumbnail': {'jpeg': 'uploads/recipe/renditions/a.jpg'},
+            },
+        )
+        # Linked out of id order.
+        self.soup.tags.add(quick)
+        self.soup.tags.add(vegan)
+        self.soup.ingredients.add(salt)
+        Recipe.objects.create(
+            user=self.user, title='Water', time_minutes=1,
+            price=Decimal('0.00'),
+        )
+
+    def render(self, data):
+        return JSONRenderer().render(data)
+
+    def recipes(self):
+        """The user's recipes as the serializers read them."""
+        return Recipe.objects.filter(user=self.user).prefetch_related(
+            Prefetch('tags', queryset=Tag.objects.order_by('id')),
+            Prefetch(
+                'ingredients', queryset=Ingredient.objects.order_by('id'),
+            ),
+        ).order_by('-id')
+
+    def test_recipe_rows(self):
+        """Test the recipe rows match the RecipeSerializer output."""
+        request = APIRequestFactory().get(RECIPE_URL)
+        recipes = self.recipes()
+        expected = serializers.RecipeSerializer(
+            recipes, many=True, context={'request': request},
+        ).data
+
+        rows = listing.recipe_list_rows(
+            list(listing.recipe_list_values(recipes)), request
+        )
+
+        self.assertEqual(self.render(rows), self.render(expected))
+
+    def test_recipe_list_response(self):
+        """Test the recipe list responds with the serializer output."""
+        res = self.client.get(RECIPE_URL)
+
+        request = res.wsgi_request
+        expected = serializers.RecipeSerializer(
+            self.recipes(), many=True, context={'request': request},
+        ).data
+        self.assertEqual(
+            self.render(res.data['results']), self.render(expected)
+        )
+
+    def test_tag_list_with_counts(self):
+        """Test the tag rows with counts match the serializer output."""
+        res = self.client.get(TAG_URL, {'with_counts': 1})
+
+        expected = serializers.TagCountSerializer(
+            annotate_recipe_count(
+                Tag.objects.filter(user=self.user)
+            ).order_by('-name', '-id'),
+            many=True,
+        ).data
+        self.assertEqual(
+            self.render(res.data['results']), self.render(expected)
+        )
+
+    def test_ingredient_list(self):
+        """Test the ingredient rows match the serializer output."""
+        res = self.client.get(INGREDIENT_URL)
+
+        expected = serializers.IngredientSerializer(
+            Ingredient.objects.filter(user=self.user).order_by('-name', '-id'),
+            many=True,
+        ).data
+        self.assertEqual(
+            self.render(res.data['results']), self.render(expected)
+        )
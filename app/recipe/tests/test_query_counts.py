@@ -0,0 +1,166 @@
+"""
+Query count budgets for the recipe API endpoints.
+
+Each endpoint is requested against a small and a larger data set and must
+issue exactly its budgeted number of queries both times, so an N+1 query
+cannot creep back in unnoticed.
+"""
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+
+
+RECIPE_URL = reverse('recipe:recipe-list')
+TAG_URL = reverse('recipe:tag-list')
+INGREDIENT_URL = reverse('recipe:ingredient-list')
+
+
+def create_user(email='query@example.com', password='12345'):
+    return get_user_model().objects.create_user(email, password)
+
+
+def seed_recipes(user, count, start=0):
+    """Create `count` recipes each with two tags and two ingredients."""
+    recipes = []
+    for i in range(start, start + count):
+        recipe = Recipe.objects.create(
+            user=user,
+            title=f'Recipe {i}',
+            time_minutes=10,
+            price=Decimal('5.00'),
+        )
+        recipe.tags.add(
+            Tag.objects.create(user=user, name=f'Tag {i}a'),
+            Tag.objects.create(user=user, name=f'Tag {i}b'),
+        )
+        recipe.ingredients.add(
+            Ingredient.objects.create(user=user, name=f'Ingredient {i}a'),
+            Ingredient.objects.create(user=user, name=f'Ingredient {i}b'),
+        )
+        recipes.append(recipe)
+    return recipes
+
+
+class QueryCountTests(TestCase):
+    """Every endpoint must stay within its query budget at any size."""
+
+    def setUp(self):
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assertQueryBudget(self, budget, url, params=None):
+        """Request `url` on a small and a larger data set."""
+        for count in (1, 10):
+            seed_recipes(self.user, count, start=Recipe.objects.count())
+            target = url() if callable(url) else url
+            query = params() if callable(params) else params
+            with CaptureQueriesContext(connection) as ctx:
+                res = self.client.get(target, query)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(
+                len(ctx.captured_queries), budget,
+                f'{target} issued {len(ctx.captured_queries)} queries with '
+                f'{Recipe.objects.count()} recipes, budget is {budget}:\n'
+                + '\n'.join(q['sql'] for q in ctx.captured_queries),
+            )
+
+    def test_recipe_list(self):
+        self.assertQueryBudget(4, RECIPE_URL)
+
+    def test_recipe_list_filtered(self):
+        def params():
+            tags = Tag.objects.filter(user=self.user).values_list(
+                'id', flat=True,
+            )
+            return {'tags': ','.join(str(pk) for pk in tags)}
+
+        self.assertQueryBudget(4, RECIPE_URL, params)
+
+    def test_recipe_detail(self):
+        def url():
+            recipe = Recipe.objects.filter(user=self.user).latest('id')
+            return reverse('recipe:recipe-detail', args=[recipe.id])
+
+        self.assertQueryBudget(4, url)
+
+    def test_tag_list(self):
+        self.assertQueryBudget(2, TAG_URL)
+
+    def test_tag_list_assigned_only(self):
+        self.assertQueryBudget(2, TAG_URL, {'assigned_only': 1})
+
+    def test_tag_list_with_counts(self):
+        self.assertQueryBudget(2, TAG_URL, {'with_counts': 1})
+
+    def test_ingredient_list(self):
+        self.assertQueryBudget(2, INGREDIENT_URL)
+
+    def test_ingredient_list_assigned_only(self):
+        self.assertQueryBudget(2, INGREDIENT_URL, {'assigned_only': 1})
+
+    def test_ingredient_list_with_counts(self):
+        self.assertQueryBudget(2, INGREDIENT_URL, {'with_counts': 1})
+
+
+class WriteQueryCountTests(TestCase):
+    """Nested tags and ingredients are written in a constant number of
+    queries.
+    """
+
+    def setUp(self):
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def count_create_queries(self, size):
+        Ingredient.objects.create(user=self.user, name=f'Existing {size}')
+        payload = {
+            'title': 'Curry',
+            'time_minutes': 30,
+            'price': Decimal('5.00'),
+            'tags': [{'name': f'Tag {size} {i}'} for i in range(size)],
+            'ingredients': [{'name': f'Existing {size}'}] + [
+                {'name': f'Ingredient {size} {i}'} for i in range(size)
+            ],
+        }
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.post(RECIPE_URL, payload, format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data['ingredients']), size + 1)
+        return len(ctx.captured_queries)
+
+    def test_create_recipe_with_nested_items(self):
+        self.assertEqual(
+            self.count_create_queries(3), self.count_create_queries(30)
+        )
+
+    def test_update_recipe_with_nested_items(self):
+        counts = []
+        for size in (3, 30):
+            recipe = Recipe.objects.create(
+                user=self.user, title='Soup', time_minutes=5,
+                price=Decimal('1.00'),
+            )
+            recipe.tags.add(
+                Tag.objects.create(user=self.user, name=f'Old {size}')
+            )
+            url = reverse('recipe:recipe-detail', args=[recipe.id])
+            payload = {
+                'tags': [{'name': f'Tag {size} {i}'} for i in range(size)],
+            }
+            with CaptureQueriesContext(connection) as ctx:
+                res = self.client.patch(url, payload, format='json')
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertEqual(recipe.tags.count(), size)
+            counts.append(len(ctx.captured_queries))
+
+        self.assertEqual(counts[0], counts[1])
@@ -0,0 +1,138 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models.functions import Lower
+from django.test import TestCase
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from core.models import Recipe, Tag, Ingredient
+from recipe import views
+
+
+OTHER_USERS = 20
+ROWS_PER_USER = 50
+
+
+def create_user(email):
+    return get_user_model().objects.create_user(email, '12345')
+
+
+class ListQueryPlanTests(TestCase):
+    """Test the list queries are served by the per-user indexes.
+
+    The dataset spreads the rows over many users, so a plan that scans a
+    whole table instead of the current user's slice of an index stands out.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        users = [
+            create_user(f'plan{i}@example.com') for i in range(OTHER_USERS)
+        ]
+        cls.user = users[0]
+        recipes = Recipe.objects.bulk_create(
+            Recipe(
+                user=user, title=f'Recipe {i}', time_minutes=10,
+                price=Decimal('5.00'),
+            )
+            for user in users for i in range(ROWS_PER_USER)
+        )
+        tags = Tag.objects.bulk_create(
+            Tag(user=user, name=f'Tag {i}')
+            for user in users for i in range(ROWS_PER_USER)
+        )
+        ingredients = Ingredient.objects.bulk_create(
+            Ingredient(user=user, name=f'Ingredient {i}')
+            for user in users for i in range(ROWS_PER_USER)
+        )
+        if recipes[0].pk is None:
+            recipes = list(Recipe.objects.order_by('id'))
+            tags = list(Tag.objects.order_by('id'))
+            ingredients = list(Ingredient.objects.order_by('id'))
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(recipe_id=recipe.pk, tag_id=tag.pk)
+            for recipe, tag in zip(recipes, tags)
+        )
+        Recipe.ingredients.through.objects.bulk_create(
+            Recipe.ingredients.through(
+                recipe_id=recipe.pk, ingredient_id=ingredient.pk,
+            )
+            for recipe, ingredient in zip(recipes, ingredients)
+        )
+        cls.tag = tags[0]
+        cls.ingredient = ingredients[0]
+
+    def setUp(self):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def page_queryset(self, viewset, **params):
+        """Return the queryset of the first page `viewset` lists."""
+        request = Request(APIRequestFactory().get('/', params))
+        request.user = self.user
+        view = viewset(action='list', request=request, format_kwarg=None)
+        queryset = view.get_queryset()
+        paginator = view.paginator
+        ordering = paginator.get_ordering(request, queryset, view)
+        page_size = paginator.get_page_size(request)
+        return queryset.order_by(*ordering)[:page_size + 1]
+
+    def assertUsesIndex(self, queryset, index=None):
+        """Assert the plan of `queryset` reads `index` and scans no table."""
+        plan = queryset.explain()
+        if index:
+            self.assertIn(index, plan, plan)
+        if connection.vendor == 'postgresql':
+            self.assertNotIn('Seq Scan', plan)
+        else:
+            self.assertNotRegex(plan, r'\bSCAN\b')
+
+    def test_recipe_list(self):
+        """Test the recipe list reads the (user, id) index."""
+        self.assertUsesIndex(
+            self.page_queryset(views.RecipeViewsets), 'recipe_user_id_idx'
+        )
+
+    def test_recipe_list_filtered_by_tag(self):
+        """Test filtering by tags only reads indexes."""
+        for match in ('any', 'all'):
+            self.assertUsesIndex(self.page_queryset(
+                views.RecipeViewsets, tags=str(self.tag.id), match=match,
+            ))
+
+    def test_recipe_list_filtered_by_ingredient(self):
+        """Test filtering by ingredients only reads indexes."""
+        for match in ('any', 'all'):
+            self.assertUsesIndex(self.page_queryset(
+                views.RecipeViewsets,
+                ingredients=str(self.ingredient.id), match=match,
+            ))
+
+    # The tag and ingredient pages below are smaller than the user's rows,
+    # so the page is read in index order rather than sorted.
+
+    def test_tag_list(self):
+        """Test the tag list reads the (user, name, id) index."""
+        self.assertUsesIndex(
+            self.page_queryset(views.TagViewSet, page_size=10),
+            'tag_user_name_idx',
+        )
+
+    def test_ingredient_list(self):
+        """Test the ingredient list reads the (user, name, id) index."""
+        self.assertUsesIndex(
+            self.page_queryset(views.IngredientViewsets, page_size=10),
+            'ingredient_user_name_idx',
+        )
+
+    def test_tag_lookup_by_name(self):
+        """Test looking tags up by name reads the unique name index."""
+        self.assertUsesIndex(
+            Tag.objects.annotate(name_key=Lower('name')).filter(
+                user=self.user, name_key__in=['tag 1', 'tag 2'],
+            ),
+            'tag_user_lower_name_uniq' if connection.vendor == 'postgresql'
+            else None,
+        )
@@ -1,10 +1,15 @@
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
 from core.models import Recipe , Tag , Ingredient
+from recipe import serializers
 from recipe.serializers import RecipeSerializer , RecipeDetailSerializer , IngredientSerializer
 from decimal import Decimal
+from unittest.mock import patch
 from rest_framework import status
 from rest_framework.test import APIClient
+from recipe.pagination import RecipeCursorPagination
 from django.urls import reverse
 import tempfile
 import os
@@ -63,7 +68,7 @@ class PrivateRecipeApiTests(TestCase):
         recipes = Recipe.objects.all()
         serializer= RecipeSerializer(recipes  , many = True)
 
-        self.assertEqual(serializer.data , res.data)
+        self.assertEqual(serializer.data , res.data['results'])
         self.assertEqual(res.status_code , status.HTTP_200_OK)
 
     def test_recipe_list_limited_to_user(self):
@@ -78,7 +83,7 @@ class PrivateRecipeApiTests(TestCase):
         res = self.client.get(RECIPE_URL)
         recipes = Recipe.objects.filter(user =self.user)
         serializer = RecipeSerializer(recipes , many = True)
-        self.assertEqual(res.data , serializer.data)
+        self.assertEqual(res.data['results'] , serializer.data)
         # self.assertEqual()
 
     def test_get_recipe_detail(self):
@@ -339,6 +344,170 @@ class PrivateRecipeApiTests(TestCase):
         self.assertEqual(res.status_code , status.HTTP_200_OK)
         self.assertEqual(0, recipe.ingredients.count())
 
+    def test_create_recipe_reuses_tag_in_other_case(self):
+        """Test a tag name matches the user's tag regardless of case."""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        payload = {
+            'title': 'Salad', 'time_minutes': 5, 'price': Decimal('2.00'),
+            'tags': [{'name': 'vegan'}, {'name': 'VEGAN'}],
+        }
+
+        res = self.client.post(RECIPE_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=res.data['id'])
+        self.assertEqual(list(recipe.tags.all()), [tag])
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+
+    def test_create_recipe_with_non_ascii_tags(self):
+        """Test tag names whose case the database and Python fold
+        differently are created once and reused.
+        """
+        names = ['École', 'ΟΔΟΣ', 'οδοσ']
+        payload = {
+            'title': 'Salad', 'time_minutes': 5, 'price': Decimal('2.00'),
+            'tags': [{'name': name} for name in names],
+        }
+        # The first name of each case the database folds to is stored.
+        stored = {}
+        with connection.cursor() as cursor:
+            for name in names:
+                cursor.execute('SELECT LOWER(%s)', [name])
+                stored.setdefault(cursor.fetchone()[0], name)
+
+        res = self.client.post(RECIPE_URL, payload, format='json')
+        again = self.client.post(RECIPE_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(again.status_code, status.HTTP_201_CREATED)
+        tags = Tag.objects.filter(user=self.user)
+        self.assertEqual(tags.count(), len(stored))
+        self.assertEqual(
+            sorted(tag.name for tag in tags), sorted(stored.values())
+        )
+        self.assertEqual(
+            sorted(tag['id'] for tag in res.data['tags']),
+            sorted(tag.id for tag in tags),
+        )
+        self.assertEqual(
+            sorted(tag['id'] for tag in again.data['tags']),
+            sorted(tag.id for tag in tags),
+        )
+
+    def test_create_tag_inserted_concurrently(self):
+        """Test a tag another request inserts meanwhile is used, not
+        duplicated.
+        """
+        payload = {
+            'title': 'Salad', 'time_minutes': 5, 'price': Decimal('2.00'),
+            'tags': [{'name': 'vegan'}],
+        }
+        find = serializers._find_by_name
+
+        def find_after_race(model, user, keys):
+            # The other request commits between our lookup and insert.
+            if not model.objects.filter(user=user).exists():
+                model.objects.create(user=user, name='Vegan')
+                return {}
+            return find(model, user, keys)
+
+        with patch.object(serializers, '_find_by_name', find_after_race):
+            res = self.client.post(RECIPE_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        tags = Tag.objects.filter(user=self.user)
+        self.assertEqual([tag.name for tag in tags], ['Vegan'])
+        self.assertEqual(
+            list(Recipe.objects.get(id=res.data['id']).tags.all()),
+            list(tags),
+        )
+
+    def test_update_keeps_relations_not_sent(self):
+        """Test a PATCH without tags or ingredients leaves their links."""
+        tag = Tag.objects.create(user=self.user, name='lunch')
+        ingredient = Ingredient.objects.create(user=self.user, name='lemon')
+        recipe = create_recipe(self.user)
+        recipe.tags.add(tag)
+        recipe.ingredients.add(ingredient)
+
+        res = self.client.patch(detail_url(recipe.id), {'title': 'New'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn(tag, recipe.tags.all())
+        self.assertIn(ingredient, recipe.ingredients.all())
+
+    def test_update_relinks_by_difference(self):
+        """Test only the links that changed are deleted and inserted."""
+        lunch = Tag.objects.create(user=self.user, name='lunch')
+        vegan = Tag.objects.create(user=self.user, name='vegan')
+        recipe = create_recipe(self.user)
+        recipe.tags.add(lunch, vegan)
+        through = Recipe.tags.through
+        kept = through.objects.get(recipe=recipe, tag=vegan).pk
+
+        payload = {'tags': [{'name': 'vegan'}, {'name': 'quick'}]}
+        res = self.client.patch(detail_url(recipe.id), payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            set(recipe.tags.values_list('name', flat=True)),
+            {'vegan', 'quick'},
+        )
+        self.assertTrue(through.objects.filter(pk=kept).exists())
+
+    def test_update_saves_changed_columns_only(self):
+        """Test the UPDATE writes the changed columns and the version."""
+        recipe = create_recipe(self.user, title='Soup')
+        payload = {'title': 'Stew', 'time_minutes': recipe.time_minutes}
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.patch(detail_url(recipe.id), payload)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        updates = [
+            q['sql'] for q in ctx.captured_queries
+            if q['sql'].startswith('UPDATE "core_recipe" SET "title"')
+        ]
+        self.assertEqual(len(updates), 1)
+        self.assertNotIn('"description"', updates[0])
+        self.assertNotIn('"time_minutes"', updates[0])
+        self.assertIn('"updated_at"', updates[0])
+
+    def test_update_without_changes_does_not_write(self):
+        """Test an update that changes nothing issues no UPDATE."""
+        recipe = create_recipe(self.user, title='Soup')
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.patch(detail_url(recipe.id), {'title': 'Soup'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertFalse(any(
+            q['sql'].startswith('UPDATE') for q in ctx.captured_queries
+        ))
+
+    def test_recipe_list_paginated(self):
+        """Test following cursors walks every recipe exactly once."""
+        recipes = [create_recipe(user=self.user) for _ in range(5)]
+
+        res = self.client.get(RECIPE_URL, {'page_size': 2})
+        seen = [r['id'] for r in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            seen.extend(r['id'] for r in res.data['results'])
+
+        self.assertEqual(seen, sorted((r.id for r in recipes), reverse=True))
+
+    @patch.object(RecipeCursorPagination, 'max_page_size', 3)
+    def test_recipe_page_size_capped(self):
+        """Test page_size cannot exceed the configured maximum."""
+        for _ in range(5):
+            create_recipe(user=self.user)
+
+        res = self.client.get(RECIPE_URL, {'page_size': 100})
+
+        self.assertEqual(len(res.data['results']), 3)
+        self.assertIsNotNone(res.data['next'])
+
 
 class ImageUploadTests(TestCase):
     """Tests for the image upload API."""
@@ -394,9 +563,9 @@ class ImageUploadTests(TestCase):
         s1 = RecipeSerializer(r1)
         s2 = RecipeSerializer(r2)
         s3 = RecipeSerializer(r3)
-        self.assertIn(s1.data, res.data)
-        self.assertIn(s2.data, res.data)
-        self.assertNotIn(s3.data, res.data)
+        self.assertIn(s1.data, res.data['results'])
+        self.assertIn(s2.data, res.data['results'])
+        self.assertNotIn(s3.data, res.data['results'])
 
     def test_filter_by_ingredients(self):
         """Test filtering recipes by ingredients."""
@@ -414,6 +583,64 @@ class ImageUploadTests(TestCase):
         s1 = RecipeSerializer(r1)
         s2 = RecipeSerializer(r2)
         s3 = RecipeSerializer(r3)
-        self.assertIn(s1.data, res.data)
-        self.assertIn(s2.data, res.data)
-        self.assertNotIn(s3.data, res.data)
+        self.assertIn(s1.data, res.data['results'])
+        self.assertIn(s2.data, res.data['results'])
+        self.assertNotIn(s3.data, res.data['results'])
+
+    def test_filter_by_several_matching_tags_no_duplicates(self):
+        """Test a recipe matching several of the tags is listed once."""
+        r1 = create_recipe(user=self.user, title='Thai Vegetable Curry')
+        tag1 = Tag.objects.create(user=self.user, name='Vegan')
+        tag2 = Tag.objects.create(user=self.user, name='Spicy')
+        r1.tags.add(tag1, tag2)
+
+        params = {'tags': f'{tag1.id},{tag2.id}'}
+        res = self.client.get(RECIPE_URL, params)
+
+        self.assertEqual([r['id'] for r in res.data['results']], [r1.id])
+
+    def test_filter_match_all(self):
+        """Test match=all only returns recipes with every listed tag."""
+        r1 = create_recipe(user=self.user, title='Thai Vegetable Curry')
+        r2 = create_recipe(user=self.user, title='Aubergine with Tahini')
+        tag1 = Tag.objects.create(user=self.user, name='Vegan')
+        tag2 = Tag.objects.create(user=self.user, name='Spicy')
+        r1.tags.add(tag1, tag2)
+        r2.tags.add(tag1)
+        params = {'tags': f'{tag1.id},{tag2.id}'}
+
+        res_any = self.client.get(RECIPE_URL, params)
+        res_all = self.client.get(RECIPE_URL, {**params, 'match': 'all'})
+
+        self.assertEqual(
+            {r['id'] for r in res_any.data['results']}, {r1.id, r2.id}
+        )
+        self.assertEqual([r['id'] for r in res_all.data['results']], [r1.id])
+
+    def test_filter_match_all_tags_and_ingredients(self):
+        """Test match=all applies to tags and ingredients together."""
+        r1 = create_recipe(user=self.user, title='Chicken Curry')
+        r2 = create_recipe(user=self.user, title='Chicken Soup')
+        tag = Tag.objects.create(user=self.user, name='Spicy')
+        ing1 = Ingredient.objects.create(user=self.user, name='Chicken')
+        ing2 = Ingredient.objects.create(user=self.user, name='Chili')
+        r1.tags.add(tag)
+        r1.ingredients.add(ing1, ing2)
+        r2.tags.add(tag)
+        r2.ingredients.add(ing1)
+
+        params = {
+            'tags': str(tag.id),
+            'ingredients': f'{ing1.id},{ing2.id}',
+            'match': 'all',
+        }
+        res = self.client.get(RECIPE_URL, params)
+
+        self.assertEqual([r['id'] for r in res.data['results']], [r1.id])
+
+    def test_filter_invalid_match(self):
+        """Test an unknown match mode is rejected."""
+        res = self.client.get(RECIPE_URL, {'match': 'some'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('match', res.data)
@@ -0,0 +1,56 @@
+import datetime
+import uuid
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from recipe import renderers
+from recipe.renderers import FastJSONRenderer
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    data = {
+        'title': 'Crème brûlée\u2028\u2029',
+        'price': Decimal('5.50'),
+        'id': uuid.UUID(int=1),
+        'created': datetime.datetime(
+            2024, 1, 2, 3, 4, 5, 678901, tzinfo=timezone.utc
+        ),
+        'date': datetime.date(2024, 1, 2),
+        'tags': [{'id': 1, 'name': 'Vegan'}],
+        1: None,
+    }
+
+    def test_same_output_as_drf(self):
+        """Test the fast renderer gives the bytes of the DRF renderer."""
+        expected = JSONRenderer().render(self.data)
+
+        self.assertEqual(FastJSONRenderer().render(self.data), expected)
+
+    def test_same_output_without_orjson(self):
+        """Test the standard library fallback gives the same bytes."""
+        expected = JSONRenderer().render(self.data)
+
+        with patch.object(renderers, 'orjson', None):
+            self.assertEqual(FastJSONRenderer().render(self.data), expected)
+
+    def test_big_integers(self):
+        """Test integers beyond 64 bits fall back to the standard library."""
+        rendered = FastJSONRenderer().render({'n': 2 ** 70})
+
+        self.assertEqual(rendered, b'{"n":1180591620717411303424}')
+
+    def test_indent(self):
+        """Test indented output as the browsable API asks for it."""
+        rendered = FastJSONRenderer().render(
+            {'a': 1}, 'application/json; indent=4'
+        )
+
+        self.assertEqual(rendered, b'{\n    "a": 1\n}')
+
+    def test_none(self):
+        """Test no data renders as an empty body."""
+        self.assertEqual(FastJSONRenderer().render(None), b'')
@@ -0,0 +1,157 @@
+from decimal import Decimal
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+from core.search import search_recipes
+
+
+RECIPE_URL = reverse('recipe:recipe-list')
+POSTGRESQL = connection.vendor == 'postgresql'
+
+
+def create_user(email='search@example.com', password='12345'):
+    return get_user_model().objects.create_user(email, password)
+
+
+class RecipeSearchTests(TestCase):
+    def setUp(self):
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_recipe(self, title, description='', tags=(), ingredients=()):
+        recipe = Recipe.objects.create(
+            user=self.user, title=title, description=description,
+            time_minutes=10, price=Decimal('5.00'),
+        )
+        for name in tags:
+            recipe.tags.add(Tag.objects.create(user=self.user, name=name))
+        for name in ingredients:
+            recipe.ingredients.add(
+                Ingredient.objects.create(user=self.user, name=name)
+            )
+        return recipe
+
+    def search(self, text, **params):
+        res = self.client.get(RECIPE_URL, {'search': text, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res
+
+    def search_ids(self, text):
+        return {r['id'] for r in self.search(text).data['results']}
+
+    def test_search_title_and_description(self):
+        """Test words are matched in titles and descriptions."""
+        r1 = self.create_recipe('Vegetable curry')
+        r2 = self.create_recipe('Soup', description='A hearty curry soup')
+        self.create_recipe('Pancakes')
+
+        self.assertEqual(self.search_ids('curry'), {r1.id, r2.id})
+
+    def test_search_tags_and_ingredients(self):
+        """Test words are matched in tag and ingredient names."""
+        r1 = self.create_recipe('Dal', tags=['Lentils'])
+        r2 = self.create_recipe('Stew', ingredients=['Lentils'])
+        self.create_recipe('Toast', tags=['Breakfast'])
+
+        self.assertEqual(self.search_ids('lentils'), {r1.id, r2.id})
+
+    def test_search_prefix(self):
+        """Test a partial word matches as a prefix."""
+        recipe = self.create_recipe('Potato salad')
+
+        self.assertEqual(self.search_ids('pota'), {recipe.id})
+
+    def test_search_requires_every_word(self):
+        """Test every word of the search has to match."""
+        recipe = self.create_recipe('Potato salad', tags=['Summer'])
+        self.create_recipe('Potato soup')
+
+        self.assertEqual(self.search_ids('potato summer'), {recipe.id})
+
+    def test_search_limited_to_user(self):
+        """Test other users' recipes are never found."""
+        other = create_user(email='other@example.com')
+        Recipe.objects.create(
+            user=other, title='Curry', time_minutes=5, price=Decimal('1.00')
+        )
+
+        self.assertEqual(self.search_ids('curry'), set())
+
+    def test_search_without_words(self):
+        """Test a search without words returns every recipe."""
+        self.create_recipe('Curry')
+
+        self.assertEqual(len(self.search_ids('  -- ')), 1)
+
+    def test_search_follows_tag_rename(self):
+        """Test renaming a tag updates what the recipe is found by."""
+        recipe = self.create_recipe('Dal', tags=['Lentils'])
+        tag = Tag.objects.get(user=self.user)
+
+        tag.name = 'Pulses'
+        tag.save()
+
+        self.assertEqual(self.search_ids('pulses'), {recipe.id})
+        self.assertEqual(self.search_ids('lentils'), set())
+
+    def test_search_follows_partial_update(self):
+        """Test a PATCH of the title updates what the recipe is found by."""
+        recipe = self.create_recipe('Dal', tags=['Lentils'])
+
+        res = self.client.patch(
+            reverse('recipe:recipe-detail', args=[recipe.id]),
+            {'title': 'Curry'},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.search_ids('curry'), {recipe.id})
+        self.assertEqual(self.search_ids('lentils'), {recipe.id})
+
+    @skipUnless(POSTGRESQL, 'Ranking needs PostgreSQL full-text search.')
+    def test_search_ranked(self):
+        """Test title matches rank above description matches."""
+        in_description = self.create_recipe(
+            'Soup', description='Serve with curry bread'
+        )
+        in_title = self.create_recipe('Curry')
+
+        res = self.search('curry')
+
+        self.assertEqual(
+            [r['id'] for r in res.data['results']],
+            [in_title.id, in_description.id],
+        )
+
+    @skipUnless(POSTGRESQL, 'Ranking needs PostgreSQL full-text search.')
+    def test_ranked_results_paginate(self):
+        """Test cursors walk ranked results without gaps or repeats."""
+        recipes = [
+            self.create_recipe(f'Curry {i}', description='curry ' * i)
+            for i in range(5)
+        ]
+
+        res = self.search('curry', page_size=2)
+        seen = [r['id'] for r in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            seen.extend(r['id'] for r in res.data['results'])
+
+        self.assertEqual(sorted(seen), sorted(r.id for r in recipes))
+
+    @skipUnless(POSTGRESQL, 'Ranking needs PostgreSQL full-text search.')
+    def test_rank_round_trips(self):
+        """Test a rank read back filters to its row, as cursors do."""
+        for i in range(3):
+            self.create_recipe(f'Curry {i}', description='curry bread ' * i)
+        results = search_recipes(Recipe.objects.all(), 'curry')
+
+        for recipe in results:
+            self.assertTrue(results.filter(rank=recipe.rank).exists())
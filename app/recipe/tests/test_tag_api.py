@@ -1,3 +1,4 @@
+from django.db import IntegrityError, transaction
 from django.test import TestCase
 from django.urls import reverse
 from django.contrib.auth import get_user_model
@@ -48,7 +49,7 @@ class PrivateTagApiTest(TestCase):
         tags = Tag.objects.all().order_by('-name')
         serializer = TagSerializer(tags , many= True)
         self.assertEqual(res.status_code , status.HTTP_200_OK)
-        self.assertEqual(res.data , serializer.data)
+        self.assertEqual(res.data['results'] , serializer.data)
 
     def test_tags_limited_to_user(self):
         secondUser = create_user(email = 'abc3@example.com' , password='12345')
@@ -61,8 +62,8 @@ class PrivateTagApiTest(TestCase):
             name ='Tag of FirstUser'
         )
         res = self.client.get(TAG_URL)
-        self.assertEqual(len(res.data) , 1)
-        self.assertEqual(res.data[0]['name'], tag.name)
+        self.assertEqual(len(res.data['results']) , 1)
+        self.assertEqual(res.data['results'][0]['name'], tag.name)
         self.assertEqual(res.status_code , status.HTTP_200_OK)
 
     def test_update_tag(self):
@@ -106,8 +107,8 @@ class PrivateTagApiTest(TestCase):
 
         s1 = TagSerializer(tag1)
         s2 = TagSerializer(tag2)
-        self.assertIn(s1.data, res.data)
-        self.assertNotIn(s2.data, res.data)
+        self.assertIn(s1.data, res.data['results'])
+        self.assertNotIn(s2.data, res.data['results'])
 
     def test_filtered_tags_unique(self):
         """Test filtered tags returns a unique list."""
@@ -130,4 +131,72 @@ class PrivateTagApiTest(TestCase):
 
         res = self.client.get(TAG_URL, {'assigned_only': 1})
 
-        self.assertEqual(len(res.data), 1)
\ No newline at end of file
+        self.assertEqual(len(res.data['results']), 1)
+
+    def test_tags_paginated(self):
+        """Test following cursors walks every tag exactly once."""
+        tags = [
+            Tag.objects.create(user=self.user, name=name)
+            for name in [
+                'Dinner', 'Dinner 2', 'Dinner 3', 'Lunch', 'Breakfast',
+            ]
+        ]
+
+        res = self.client.get(TAG_URL, {'page_size': 2})
+        seen = [t['id'] for t in res.data['results']]
+        while res.data['next']:
+            res = self.client.get(res.data['next'])
+            seen.extend(t['id'] for t in res.data['results'])
+
+        expected = sorted(tags, key=lambda t: (t.name, t.id), reverse=True)
+        self.assertEqual(seen, [t.id for t in expected])
+
+    def test_duplicate_name_rejected(self):
+        """Test a user can not have two tags whose names differ in case."""
+        Tag.objects.create(user=self.user, name='Dinner')
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Tag.objects.create(user=self.user, name='dinner')
+
+    def test_rename_to_taken_name(self):
+        """Test renaming a tag to a name the user has is refused."""
+        Tag.objects.create(user=self.user, name='Dinner')
+        tag = Tag.objects.create(user=self.user, name='Lunch')
+
+        res = self.client.patch(detail_url(tag.id), {'name': 'DINNER'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        tag.refresh_from_db()
+        self.assertEqual(tag.name, 'Lunch')
+
+    def test_rename_case_only(self):
+        """Test a tag can change the case of its own name."""
+        tag = Tag.objects.create(user=self.user, name='dinner')
+
+        res = self.client.patch(detail_url(tag.id), {'name': 'Dinner'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_tags_with_counts(self):
+        """Test with_counts returns how many recipes use each tag."""
+        tag1 = Tag.objects.create(user=self.user, name='Breakfast')
+        tag2 = Tag.objects.create(user=self.user, name='Lunch')
+        for title in ('Pancakes', 'Porridge'):
+            recipe = Recipe.objects.create(
+                title=title, time_minutes=5, price=Decimal('2.00'),
+                user=self.user,
+            )
+            recipe.tags.add(tag1)
+
+        res = self.client.get(TAG_URL, {'with_counts': 1})
+
+        counts = {t['id']: t['recipe_count'] for t in res.data['results']}
+        self.assertEqual(counts, {tag1.id: 2, tag2.id: 0})
+
+    def test_tags_without_counts(self):
+        """Test the recipe count is only included when asked for."""
+        Tag.objects.create(user=self.user, name='Breakfast')
+
+        res = self.client.get(TAG_URL)
+
+        self.assertNotIn('recipe_count', res.data['results'][0])
@@ -1,11 +1,28 @@
+from django.db import router, transaction
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
 from django.shortcuts import render
 from rest_framework import viewsets ,mixins , status
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
-from . import serializers
+from . import serializers, bulk, images
+from .cache import CachedListMixin
+from .filters import (
+    MATCH_ANY, MATCH_MODES,
+    annotate_recipe_count, filter_assigned, filter_by_related,
+)
+from .conditional import ConditionalListMixin, ConditionalRetrieveMixin
+from .listing import ValuesListMixin, recipe_list_rows, recipe_list_values
+from .parsers import NDJSONParser, ImageUploadParser
+from .renderers import NDJSONRenderer, CSVRenderer
+from .pagination import RecipeCursorPagination, NameCursorPagination
 from core import models
+from core.authentication import CachedTokenAuthentication
+from core.replicas import ReplicaReadMixin
+from core.shards import UserShardMixin, current_shard, iterate_on_shard
+from core.search import search_recipes
 
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from drf_spectacular.utils import (
     extend_schema_view,
@@ -30,33 +47,82 @@ from drf_spectacular.utils import (
                 OpenApiTypes.STR,
                 description='Comma separated list of ingredient IDs to filter',
             ),
+            OpenApiParameter(
+                'match',
+                OpenApiTypes.STR, enum=list(MATCH_MODES),
+                description='Whether recipes need any (default) or all of '
+                            'the listed tags and ingredients',
+            ),
+            OpenApiParameter(
+                'search',
+                OpenApiTypes.STR,
+                description='Words to search for in titles, descriptions, '
+                            'tags and ingredients, ranked by relevance',
+            ),
         ]
     )
 )
-class RecipeViewsets(viewsets.ModelViewSet):
+class RecipeViewsets(UserShardMixin,
+                     ReplicaReadMixin,
+                     ConditionalListMixin,
+                     ConditionalRetrieveMixin,
+                     CachedListMixin,
+                     ValuesListMixin,
+                     viewsets.ModelViewSet):
     serializer_class = serializers.RecipeDetailSerializer
-    queryset = models.Recipe.objects.all()
-    authentication_classes = (TokenAuthentication,)
+    queryset = models.Recipe.objects.defer('search_vector')
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes=(IsAuthenticated,)
+    pagination_class = RecipeCursorPagination
 
     def _params_to_ints(self, qs):
         """Convert a list of strings to integers."""
         return [int(str_id) for str_id in qs.split(',')]
 
     def get_queryset(self):
+        if self.action == 'upload_image':
+            # Lock the row while the image is swapped and load only the
+            # columns the image upload reads and writes.
+            return self.queryset.filter(user=self.request.user).only(
+                'id', 'user_id', 'image', 'image_renditions', 'updated_at',
+            ).select_for_update()
+
         queryset = self.queryset
         tags = self.request.query_params.get('tags')
         ingredients = self.request.query_params.get('ingredients')
+        search = self.request.query_params.get('search')
+        match = self.request.query_params.get('match', MATCH_ANY)
+        if match not in MATCH_MODES:
+            raise ValidationError(
+                {'match': f'Must be one of: {", ".join(MATCH_MODES)}.'}
+            )
         if tags :
             tag_ids = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tag_ids)
+            queryset = filter_by_related(queryset, 'tags', tag_ids, match)
         if ingredients:
             ingredient_ids = self._params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredient_ids)
+            queryset = filter_by_related(
+                queryset, 'ingredients', ingredient_ids, match
+            )
+        if search:
+            queryset = search_recipes(queryset, search)
 
         return queryset.filter(
             user = self.request.user
-        ).order_by('-id').distinct()
+        ).prefetch_related(
+            # In id order, as the list reads them, see recipe.listing.
+            Prefetch('tags', queryset=models.Tag.objects.order_by('id')),
+            Prefetch(
+                'ingredients',
+                queryset=models.Ingredient.objects.order_by('id'),
+            ),
+        ).order_by('-id')
+
+    def list_values(self, queryset):
+        return recipe_list_values(queryset)
+
+    def list_rows(self, rows):
+        return recipe_list_rows(rows, self.request)
 
     def get_serializer_class(self):
         if self.action == 'list':
@@ -69,19 +135,102 @@ class RecipeViewsets(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(user = self.request.user)
 
-    @action(methods=['POST'], detail=True, url_path='upload-image')
+    @action(methods=['POST'], detail=True, url_path='upload-image',
+            parser_classes=[ImageUploadParser])
     def upload_image(self, request, pk=None):
         """Upload an image to recipe."""
-        if pk is not None:
-            recipe = models.Recipe.objects.get(pk = pk)
-        # recipe = self.get_object()
-        serializer = self.get_serializer(recipe, data=request.data)
+        # Receive the upload before the row lock is taken.
+        data = request.data
+        with transaction.atomic(using=router.db_for_write(models.Recipe)):
+            recipe = self.get_object()
+            serializer = self.get_serializer(recipe, data=data)
+            if not serializer.is_valid():
+                return Response(
+                    serializer.errors, status=status.HTTP_400_BAD_REQUEST
+                )
+            recipe = serializer.save()
+            images.queue_renditions(recipe)
+
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    @extend_schema(
+        request={NDJSONParser.media_type: serializers.RecipeDetailSerializer},
+        responses={200: OpenApiTypes.OBJECT},
+    )
+    @action(methods=['POST'], detail=False, url_path='import',
+            parser_classes=[NDJSONParser])
+    def bulk_import(self, request):
+        """Import recipes from a newline delimited JSON body."""
+        importer = bulk.RecipeImporter(request.user)
+        summary = importer.run(request.data or [])
+        return Response(summary, status=status.HTTP_200_OK)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'format',
+                OpenApiTypes.STR, enum=['ndjson', 'csv'],
+                description='Export format, NDJSON by default.',
+            ),
+        ],
+        responses={200: OpenApiTypes.STR},
+    )
+    @action(methods=['GET'], detail=False, url_path='export',
+            renderer_classes=[NDJSONRenderer, CSVRenderer])
+    def export(self, request):
+        """Stream the user's recipes as NDJSON or CSV.
+
+        Under ASGI the whole export is first written to a temporary file
+        on the view's pool thread, see core.asyncviews, and only then
+        sent, so the first byte waits for the last row and the export
+        takes its size in disk space until it is sent.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        rows = iterate_on_shard(
+            bulk.iter_export_rows(queryset.prefetch_related(None)),
+            current_shard(),
+        )
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(
+            renderer.stream(rows),
+            content_type=f'{renderer.media_type}; charset={renderer.charset}',
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="recipes.{renderer.format}"'
+        )
+        return response
 
-        if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data, status=status.HTTP_200_OK)
 
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+class RecipeAttrMixin:
+    """The `assigned_only` and `with_counts` options of tags and
+    ingredients.
+    """
+
+    def _flag(self, name):
+        return bool(int(self.request.query_params.get(name, 0)))
+
+    def get_queryset(self):
+        queryset = self.queryset
+        if self._flag('assigned_only'):
+            queryset = filter_assigned(queryset)
+        if self.action == 'list' and self._flag('with_counts'):
+            queryset = annotate_recipe_count(queryset)
+
+        return queryset.filter(
+            user=self.request.user
+        ).order_by('-name')
+
+    def get_serializer_class(self):
+        if self.action == 'list' and self._flag('with_counts'):
+            return self.count_serializer_class
+        return self.serializer_class
+
+    def list_values(self, queryset):
+        # The fields of the list serializer, in its order.
+        return queryset.values(*self.get_serializer_class().Meta.fields)
+
+    def list_rows(self, rows):
+        return rows
 
 
 @extend_schema_view(
@@ -92,10 +241,21 @@ class RecipeViewsets(viewsets.ModelViewSet):
                 OpenApiTypes.INT, enum=[0, 1],
                 description='Filter by items assigned to recipes.',
             ),
+            OpenApiParameter(
+                'with_counts',
+                OpenApiTypes.INT, enum=[0, 1],
+                description='Include the recipe_count of each item.',
+            ),
         ]
     )
 )
-class TagViewSet(mixins.UpdateModelMixin,
+class TagViewSet(UserShardMixin,
+                 ReplicaReadMixin,
+                 RecipeAttrMixin,
+                 ConditionalListMixin,
+                 CachedListMixin,
+                 ValuesListMixin,
+                 mixins.UpdateModelMixin,
                  mixins.DestroyModelMixin,
                  mixins.ListModelMixin ,
                  viewsets.GenericViewSet):
@@ -104,20 +264,10 @@ class TagViewSet(mixins.UpdateModelMixin,
     # the `get_object` and `get_queryset` methods.
     serializer_class = serializers.TagSerializer
     permission_classes = [IsAuthenticated]
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     queryset = models.Tag.objects.all()
-
-    def get_queryset(self):
-        assigned_only = bool(
-            int(self.request.query_params.get('assigned_only', 0))
-        )
-        queryset = self.queryset
-        if assigned_only:
-            queryset = queryset.filter(recipe__isnull=False)
-
-        return queryset.filter(
-            user=self.request.user
-        ).order_by('-name').distinct()
+    pagination_class = NameCursorPagination
+    count_serializer_class = serializers.TagCountSerializer
 
 
 @extend_schema_view(
@@ -128,27 +278,28 @@ class TagViewSet(mixins.UpdateModelMixin,
                 OpenApiTypes.INT, enum=[0, 1],
                 description='Filter by items assigned to recipes.',
             ),
+            OpenApiParameter(
+                'with_counts',
+                OpenApiTypes.INT, enum=[0, 1],
+                description='Include the recipe_count of each item.',
+            ),
         ]
     )
 )
-class IngredientViewsets(mixins.DestroyModelMixin,
+class IngredientViewsets(UserShardMixin,
+                         ReplicaReadMixin,
+                         RecipeAttrMixin,
+                         ConditionalListMixin,
+                         CachedListMixin,
+                         ValuesListMixin,
+                         mixins.DestroyModelMixin,
                          mixins.ListModelMixin ,
                          mixins.UpdateModelMixin,
                          viewsets.GenericViewSet):
 
     serializer_class = serializers.IngredientSerializer
     permission_classes =[IsAuthenticated]
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication]
     queryset = models.Ingredient.objects.all()
-
-    def get_queryset(self):
-        assigned_only = bool(
-            int(self.request.query_params.get('assigned_only', 0))
-        )
-        queryset = self.queryset
-        if assigned_only:
-            queryset = queryset.filter(recipe__isnull=False)
-
-        return queryset.filter(
-            user=self.request.user
-        ).order_by('-name').distinct()
\ No newline at end of file
+    pagination_class = NameCursorPagination
+    count_serializer_class = serializers.IngredientCountSerializer
@@ -1,8 +1,9 @@
 from django.shortcuts import render
 from rest_framework.settings import api_settings
-from rest_framework import generics , authentication
+from rest_framework import generics
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework import permissions
+from core.authentication import CachedTokenAuthentication
 from . import serializers
 
 class UserView(generics.CreateAPIView):
@@ -14,7 +15,7 @@ class TokenView(ObtainAuthToken):
 
 class ManageUserView(generics.RetrieveUpdateAPIView):
     serializer_class  = serializers.UserSerializer
-    authentication_classes = [authentication.TokenAuthentication,]
+    authentication_classes = [CachedTokenAuthentication,]
     permission_classes =[permissions.IsAuthenticated,]
     
     def get_object(self):
@@ -6,4 +6,20 @@ python manage.py wait_for_db
 python manage.py collectstatic --noinput
 python manage.py migrate
 
-uwsgi --socket :9000 --workers 4 --master --enable-threads --module app.wsgi
\ No newline at end of file
+if [ "$SERVER_MODE" = "asgi" ]; then
+    # Serves HTTP, so the proxy has to use proxy_pass instead of uwsgi_pass.
+    gunicorn app.asgi:application --bind :9000 --workers "${WEB_WORKERS:-4}" \
+        --worker-class uvicorn.workers.UvicornWorker
+else
+    # Static files are served by uWSGI itself, the precompressed copies
+    # when the client accepts gzip and the hashed names with a far Expires.
+    # Media responses carry an X-Sendfile header that uWSGI answers from
+    # its offload threads, so the workers never send file bytes.
+    export MEDIA_OFFLOAD="${MEDIA_OFFLOAD:-uwsgi}"
+    uwsgi --socket :9000 --workers "${WEB_WORKERS:-4}" --master --enable-threads --module app.wsgi \
+        --offload-threads 2 \
+        --static-map /static/static=/vol/web/static --static-gzip-all \
+        --static-expires "/vol/web/static/.*\.[0-9a-f]{12}\.[^/]+$ 31536000" \
+        --collect-header "X-Sendfile X_SENDFILE" \
+        --response-route-if-not "empty:\${X_SENDFILE} static:\${X_SENDFILE}"
+fi